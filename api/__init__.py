@@ -2,23 +2,26 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
-from dotenv import load_dotenv
-import os
 
 db = SQLAlchemy()
 jwt = JWTManager()
 
 
-def create_app():
-    # Load environment variables
-    load_dotenv()
+def create_app(config=None):
+    """
+    Build the app from config.Config (environment variables and .env), with
+    `config`, if given, overriding individual settings.
+    """
+    from config import Config
 
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
-    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 1)) * 3600
-    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = int(os.getenv('JWT_REFRESH_TOKEN_EXPIRES', 86400))
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+
+    # Connection pool settings (DB_POOL_*, DB_STATEMENT_TIMEOUT_MS)
+    from api.pool import engine_options, register_pool_metrics
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
 
     # Initialize extensions
     db.init_app(app)
@@ -27,14 +30,55 @@ def create_app():
 
     # Import and register models
     with app.app_context():
-        from api.models import User, Course, Enrollment, Assignment, Grade
+        from api.models import User, Course, Enrollment, Assignment, Grade, StudentCourseSummary, ResourceVersion, RevokedToken
+
+    # Register the orjson JSON provider (MessagePack via api.serialize.respond)
+    from api.serialize import register_serialization
+    register_serialization(app)
+
+    # Register the table version counters behind ETags
+    from api.versions import register_versions
+    register_versions(app)
+
+    # Register the response cache backend (CACHE_BACKEND)
+    from api.cache import register_cache
+    register_cache(app)
 
     # Register blueprints
     from api.controllers import register_blueprints
     register_blueprints(app)
 
+    # Register the batch endpoint (POST /batch)
+    from api.batch import register_batch
+    register_batch(app)
+
+    # Register the jti revocation check behind token_in_blocklist_loader
+    from api.revocation import register_revocation
+    register_revocation(app)
+
+    # Register the verified-JWT claims cache (JWT_CLAIMS_CACHE_SIZE)
+    from api.jwt_cache import register_jwt_cache
+    register_jwt_cache(app)
+
+    # Register the whole-institution gradebook export command (flask export-gradebooks)
+    from api.gradebook import register_gradebook_export
+    register_gradebook_export(app)
+
     # Register error handlers
     from api.errors import register_error_handlers
     register_error_handlers(app)
 
+    # Register request metrics (/metrics)
+    from api.metrics import register_metrics
+    register_metrics(app)
+    register_pool_metrics(app)
+
+    # Register the production server command (flask serve)
+    from api.serve import register_serve
+    register_serve(app)
+
+    # Register the opt-in SQL profiler (SQL_PROFILER_ENABLED)
+    from api.profiler import register_profiler
+    register_profiler(app)
+
     return app
\ No newline at end of file
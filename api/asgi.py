@@ -0,0 +1,261 @@
+# Optional ASGI app serving the read-heavy endpoints on an async engine:
+#
+#     uvicorn --factory api.asgi:create_asgi_app --workers 4 --port 5006
+#
+# Paths, query parameters (including ?fields=), response bodies and JWT
+# handling match the Flask views, so a proxy can route these GETs here and
+# everything else to `flask serve`:
+#
+#     GET /courses/list                   GET /assignments/course/<course_id>
+#     GET /enrollments/list (student)     GET /users/<user_id>
+#     GET /api/student/history (student)
+#
+# A request awaits its database round trips instead of holding a thread, so
+# one worker keeps thousands of connections in flight. Tokens are verified
+# with the Flask app's JWT settings, through the same claims cache and
+# revoked-jti set as role_required. The database URL is DATABASE_URL with an
+# async driver (sqlite -> aiosqlite, postgresql -> asyncpg) unless
+# ASYNC_DATABASE_URL is set; the extra packages are in requirements-async.txt.
+#
+# Bodies are encoded by api.serialize (JSON, or MessagePack on request).
+# Response caching and ETags stay on the Flask path.
+import re
+from urllib.parse import parse_qs
+
+from flask_jwt_extended import decode_token
+from jwt import ExpiredSignatureError, InvalidTokenError
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.exceptions import BadRequest
+from werkzeug.http import parse_accept_header
+
+from api import create_app
+from api.fields import USER_FIELDS, COURSE_FIELDS, ENROLLMENT_FIELDS, ASSIGNMENT_FIELDS, parse_fields, row_select
+from api.jwt_cache import ClaimsCache, token_digest
+from api.metrics import increment
+from api.models import User, Course, Enrollment, Assignment, StudentCourseSummary
+from api.pagination import encode_cursor, decode_cursor, parse_page_limit
+from api.revocation import ensure_loaded, is_revoked
+from api.serialize import negotiate, encode
+
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+
+def async_database_url(config):
+    if config.get('ASYNC_DATABASE_URL'):
+        return config['ASYNC_DATABASE_URL']
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver known for {backend}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def async_engine_options(config, url):
+    url = make_url(url)
+    options = {
+        "pool_pre_ping": config['DB_POOL_PRE_PING'],
+        "pool_recycle": config['DB_POOL_RECYCLE'],
+    }
+    if url.get_backend_name() != 'sqlite':
+        options.update({
+            "pool_size": config['DB_POOL_SIZE'],
+            "max_overflow": config['DB_MAX_OVERFLOW'],
+            "pool_timeout": config['DB_POOL_TIMEOUT'],
+        })
+    if url.get_backend_name() == 'postgresql' and config['DB_STATEMENT_TIMEOUT_MS'] > 0:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(config['DB_STATEMENT_TIMEOUT_MS'])}}
+    return options
+
+
+class Request:
+    def __init__(self, scope, path_params):
+        self.path_params = path_params
+        self.args = {key: values[0] for key, values in parse_qs(scope['query_string'].decode()).items()}
+        self.headers = {key.decode().lower(): value.decode() for key, value in scope['headers']}
+        self.claims = None
+
+
+class AsyncReadApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.config = flask_app.config
+        url = async_database_url(self.config)
+        self.engine = create_async_engine(url, **async_engine_options(self.config, url))
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.claims_cache = ClaimsCache(self.config['JWT_CLAIMS_CACHE_SIZE'])
+        # (pattern, handler, required role or None for any valid token)
+        self.routes = [
+            (re.compile(r'/courses/list'), self.get_courses, None),
+            (re.compile(r'/assignments/course/(?P<course_id>\d+)'), self.get_course_assignments, None),
+            (re.compile(r'/enrollments/list'), self.get_student_enrollments, 'student'),
+            (re.compile(r'/users/(?P<user_id>\d+)'), self.get_user, None),
+            (re.compile(r'/api/student/history'), self.get_student_course_history, 'student'),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        try:
+            status, body = await self.dispatch(scope)
+        except HTTPError as e:
+            status, body = e.status, e.body
+        except BadRequest as e:
+            status, body = 400, {"error": "Bad Request", "message": e.description, "status_code": 400}
+        accept = next((value.decode() for key, value in scope['headers'] if key.lower() == b'accept'), None)
+        mimetype = negotiate(parse_accept_header(accept, MIMEAccept))
+        payload = encode(body, mimetype)
+        await send({
+            "type": 'http.response.start',
+            "status": status,
+            "headers": [(b'content-type', mimetype.encode()), (b'content-length', str(len(payload)).encode()),
+                        (b'vary', b'Accept')],
+        })
+        await send({"type": 'http.response.body', "body": payload})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                with self.flask_app.app_context():
+                    ensure_loaded(self.flask_app)
+                await send({"type": 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({"type": 'lifespan.shutdown.complete'})
+                return
+
+    async def dispatch(self, scope):
+        for pattern, handler, role in self.routes:
+            match = pattern.fullmatch(scope['path'])
+            if match:
+                break
+        else:
+            raise HTTPError(404, {"error": "Not Found", "message": "The requested URL was not found on the server.",
+                                  "status_code": 404})
+        if scope['method'] != 'GET':
+            raise HTTPError(405, {"error": "Method Not Allowed",
+                                  "message": "The method is not allowed for the requested URL.", "status_code": 405})
+
+        request = Request(scope, {key: int(value) for key, value in match.groupdict().items()})
+        request.claims = self.authenticate(request, role)
+        async with self.sessions() as session:
+            return await handler(request, session)
+
+    def authenticate(self, request, role):
+        """
+        jwt_required() / role_required(role) for the async path: same error
+        responses, same claims cache and revocation check.
+        """
+        header = request.headers.get('authorization', '')
+        if not header:
+            raise HTTPError(401, {"msg": "Missing Authorization Header"})
+        parts = header.split()
+        if len(parts) != 2 or parts[0] != 'Bearer':
+            raise HTTPError(422, {"msg": "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'"})
+
+        key = token_digest(parts[1])
+        entry = self.claims_cache.get(key) if self.claims_cache.max_size > 0 else None
+        if entry is None:
+            with self.flask_app.app_context():
+                try:
+                    claims = decode_token(parts[1])
+                except ExpiredSignatureError:
+                    raise HTTPError(401, {"msg": "Token has expired"})
+                except InvalidTokenError as e:
+                    raise HTTPError(422, {"msg": str(e)})
+            if claims.get('type') == 'refresh':
+                raise HTTPError(422, {"msg": "Only non-refresh tokens are allowed"})
+            if self.claims_cache.max_size > 0:
+                self.claims_cache.put(key, claims.get('exp'), None, claims)
+        else:
+            claims = entry[2]
+
+        if is_revoked(claims['jti']):
+            raise HTTPError(401, {"msg": "Token has been revoked"})
+        if role is not None:
+            allowed = claims.get('role') == role
+            increment('auth_role_checks_total', role=claims.get('role'), outcome='allowed' if allowed else 'forbidden')
+            if not allowed:
+                raise HTTPError(403, {"message": "Access forbidden: insufficient permissions"})
+        return claims
+
+    def identity(self, request):
+        return int(request.claims[self.config['JWT_IDENTITY_CLAIM']])
+
+    async def paginate(self, session, request, statement, key_column):
+        # api.pagination.paginate for async sessions; `statement` is a
+        # row_select, whose rows lead with the primary key.
+        limit = parse_page_limit(request.args.get('limit'), self.config)
+        after = decode_cursor(request.args.get('after'))
+        if after is not None:
+            statement = statement.where(key_column > after)
+        rows = (await session.execute(statement.order_by(key_column).limit(limit + 1))).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][0])
+        return rows, next_cursor
+
+    async def get_courses(self, request, session):
+        statement, serialize = row_select(Course, parse_fields(request.args.get('fields'), COURSE_FIELDS))
+        rows, next_cursor = await self.paginate(session, request, statement, Course.id)
+        return 200, {"items": [serialize(row) for row in rows], "next_cursor": next_cursor}
+
+    async def get_course_assignments(self, request, session):
+        statement, serialize = row_select(Assignment, parse_fields(request.args.get('fields'), ASSIGNMENT_FIELDS))
+        statement = statement.where(Assignment.course_id == request.path_params['course_id'])
+        rows, next_cursor = await self.paginate(session, request, statement, Assignment.id)
+        return 200, {"items": [serialize(row) for row in rows], "next_cursor": next_cursor}
+
+    async def get_student_enrollments(self, request, session):
+        statement, serialize = row_select(Enrollment, parse_fields(request.args.get('fields'), ENROLLMENT_FIELDS))
+        statement = statement.where(Enrollment.student_id == self.identity(request))
+        rows, next_cursor = await self.paginate(session, request, statement, Enrollment.id)
+        return 200, {"items": [serialize(row) for row in rows], "next_cursor": next_cursor}
+
+    async def get_user(self, request, session):
+        statement, serialize = row_select(User, parse_fields(request.args.get('fields'), USER_FIELDS))
+        row = (await session.execute(statement.where(User.id == request.path_params['user_id']))).first()
+        if row is None:
+            return 404, {"message": "User not found"}
+        return 200, serialize(row)
+
+    async def get_student_course_history(self, request, session):
+        result = await session.execute(
+            select(
+                Course.name.label("course_name"),
+                StudentCourseSummary.enrolled_date,
+                StudentCourseSummary.grade_count,
+                StudentCourseSummary.grade_sum,
+                StudentCourseSummary.latest_grade
+            ).join(
+                Course, Course.id == StudentCourseSummary.course_id
+            ).where(
+                StudentCourseSummary.student_id == self.identity(request)
+            )
+        )
+        return 200, [{
+            "course_name": record.course_name,
+            "enrolled_date": record.enrolled_date.isoformat() if record.enrolled_date else None,
+            "grade_count": record.grade_count,
+            "average_grade": record.grade_sum / record.grade_count if record.grade_count else None,
+            "latest_grade": record.latest_grade
+        } for record in result]
+
+
+def create_asgi_app():
+    return AsyncReadApp(create_app())
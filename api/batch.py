@@ -0,0 +1,199 @@
+# POST /batch: several GET requests in one round trip.
+#
+# Sub-requests are dispatched through the app's own URL map and views, with
+# the before/after-request hooks, response cache, ETags and error handlers
+# they would get on their own, and carry the batch's Authorization header.
+# The token is verified once for the whole batch and handed to every
+# sub-request already decoded (see verify_jwt_cached).
+#
+# A batch holds its worker thread until its last sub-request is done, so it
+# is bounded three ways: at most BATCH_MAX_REQUESTS sub-requests, at most
+# BATCH_MAX_CONCURRENT batches in flight per process (the rest get an
+# immediate 503), and a BATCH_TIMEOUT budget in seconds after which the
+# sub-requests not yet started are answered 503 without running.
+#
+# With "consistent": true the sub-requests share one read-only transaction,
+# so on PostgreSQL and MySQL (REPEATABLE READ) they all see the same
+# snapshot. SQLite only shares the session. Those sub-requests bypass the
+# response cache both ways: a cached body may be newer or older than the
+# snapshot, and a body read from the snapshot must not be stored under a
+# generation bumped by a write that the snapshot can't see.
+#
+# Sub-responses are embedded in the batch's JSON, so sub-requests are always
+# made with Accept: application/json, and any that still answers with
+# something else (gradebook files, ?stream=1 listings) gets a 406 entry
+# without its body being generated.
+import threading
+import time
+
+from flask import request, jsonify, current_app, g
+from flask_jwt_extended import get_jwt, get_jwt_header
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.test import EnvironBuilder
+
+from api import db
+from api.cache import BYPASS_CACHE_ENVIRON_KEY
+from api.jwt_cache import cached_jwt_required, VERIFIED_JWT_ENVIRON_KEY
+
+# Sub-request headers taken from each entry; everything else comes from the batch.
+FORWARDED_HEADERS = ('If-None-Match',)
+
+
+def _validate(data, max_requests):
+    """The list of sub-requests in `data`, or an error message."""
+    if not isinstance(data, dict) or not isinstance(data.get('requests'), list) or not data['requests']:
+        return None, "Expected a non-empty \"requests\" list"
+    if len(data['requests']) > max_requests:
+        return None, f"At most {max_requests} requests per batch"
+    for index, sub in enumerate(data['requests']):
+        if not isinstance(sub, dict) or not isinstance(sub.get('path'), str) or not sub['path'].startswith('/'):
+            return None, f"requests[{index}]: \"path\" must be an absolute path"
+        if str(sub.get('method', 'GET')).upper() != 'GET':
+            return None, f"requests[{index}]: only GET requests can be batched"
+        if sub['path'].split('?', 1)[0].rstrip('/') == '/batch':
+            return None, f"requests[{index}]: batches cannot be nested"
+        if not isinstance(sub.get('headers', {}), dict):
+            return None, f"requests[{index}]: \"headers\" must be an object"
+    return data['requests'], None
+
+
+def _begin_snapshot():
+    db.session.rollback()
+    dialect = db.engine.dialect.name
+    options = {}
+    if dialect in ('postgresql', 'mysql'):
+        options['isolation_level'] = 'REPEATABLE READ'
+    if dialect == 'postgresql':
+        options['postgresql_readonly'] = True
+    db.session.connection(execution_options=options)
+
+
+def _sub_environ(sub, verified_jwt, consistent):
+    headers = {name: sub['headers'][name] for name in FORWARDED_HEADERS if name in sub.get('headers', {})}
+    headers['Accept'] = 'application/json'
+    if 'Authorization' in request.headers:
+        headers['Authorization'] = request.headers['Authorization']
+    builder = EnvironBuilder(
+        path=sub['path'],
+        base_url=request.url_root,
+        headers=headers,
+        environ_base={
+            'REMOTE_ADDR': request.remote_addr,
+            VERIFIED_JWT_ENVIRON_KEY: verified_jwt,
+            BYPASS_CACHE_ENVIRON_KEY: consistent,
+        },
+    )
+    try:
+        return builder.get_environ()
+    finally:
+        builder.close()
+
+
+def _dispatch(app, environ):
+    # The sub-request shares the batch's app context (and so its database
+    # session); keep its `g` from leaking into the batch or the next one.
+    saved = dict(vars(g))
+    vars(g).clear()
+    try:
+        with app.request_context(environ):
+            response = app.full_dispatch_request()
+            if response.status_code != 304 and (response.is_streamed or not response.is_json):
+                # Don't generate (or buffer) a body the batch can't carry.
+                response.close()
+                return _not_acceptable(response.mimetype)
+            body = response.get_data()
+    finally:
+        vars(g).clear()
+        vars(g).update(saved)
+
+    headers = {name: value for name, value in response.headers.items() if name != 'Content-Length'}
+    return {"status": response.status_code, "headers": headers, "body": response.get_json() if body else None}
+
+
+def _not_acceptable(mimetype):
+    return {
+        "status": 406,
+        "headers": {},
+        "body": {
+            "error": "Not Acceptable",
+            "message": f"Only JSON responses can be batched; this request returns {mimetype}.",
+            "status_code": 406
+        }
+    }
+
+
+def _skipped():
+    return {
+        "status": 503,
+        "headers": {"Retry-After": '1'},
+        "body": {
+            "error": "Service Unavailable",
+            "message": "The batch ran out of time before this request was started.",
+            "status_code": 503
+        }
+    }
+
+
+def run_batch(subs, consistent):
+    app = current_app._get_current_object()
+    verified_jwt = (get_jwt_header(), get_jwt())
+    deadline = time.monotonic() + app.config['BATCH_TIMEOUT']
+    responses = []
+    if consistent:
+        _begin_snapshot()
+    try:
+        for sub in subs:
+            if time.monotonic() >= deadline:
+                responses.append(_skipped())
+                continue
+            responses.append(_dispatch(app, _sub_environ(sub, verified_jwt, consistent)))
+            if not consistent:
+                db.session.rollback()
+            elif responses[-1]['status'] >= 500:
+                # A failed statement may have aborted the transaction.
+                _begin_snapshot()
+    finally:
+        db.session.rollback()
+    return responses
+
+
+def register_batch(app):
+    slots = threading.BoundedSemaphore(app.config['BATCH_MAX_CONCURRENT'])
+
+    # Run several GET requests in one round trip
+    @app.route('/batch', methods=['POST'], endpoint='batch')
+    @cached_jwt_required()
+    def batch():
+        """
+        Run up to BATCH_MAX_REQUESTS GET requests with the caller's token.
+        Endpoint: POST /batch
+        Expects JSON:
+        {
+            "requests": [
+                {"path": "/users/3"},
+                {"path": "/courses/list?limit=10", "headers": {"If-None-Match": "\\"...\\""}},
+                ...
+            ],
+            "consistent": bool (optional, read every request from one snapshot)
+        }
+        Only If-None-Match is taken from a request's "headers"; requests are
+        made with Accept: application/json, and one whose response would not
+        be JSON (gradebook files, streamed listings) is answered 406.
+        Response (in request order):
+        {
+            "responses": [
+                {"status": int, "headers": {...}, "body": ...},
+                ...
+            ]
+        }
+        """
+        subs, error = _validate(request.get_json(silent=True), app.config['BATCH_MAX_REQUESTS'])
+        if error:
+            return jsonify({"message": error}), 400
+        if not slots.acquire(blocking=False):
+            raise ServiceUnavailable("Too many batches in progress, please retry shortly", retry_after=1)
+        try:
+            responses = run_batch(subs, bool(request.json.get('consistent')))
+        finally:
+            slots.release()
+        return jsonify({"responses": responses}), 200
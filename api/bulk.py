@@ -0,0 +1,96 @@
+import csv
+import io
+from itertools import islice
+
+from flask import request
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.exceptions import BadRequest
+
+from api import db
+
+
+def read_rows():
+    """
+    Yield (row_number, row) pairs from the request body, which is either a
+    JSON array of objects or a `text/csv` upload with a header row. CSV bodies
+    are decoded straight off the request stream, so the upload is never held
+    in memory as a whole.
+    """
+    if request.mimetype == 'text/csv':
+        text = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8', newline='')
+        yield from enumerate(csv.DictReader(text), start=1)
+        return
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise BadRequest("Expected a JSON array or a text/csv body")
+    yield from enumerate(data, start=1)
+
+
+def chunked(iterable, size):
+    """
+    Split an iterable into lists of at most `size` items.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _unique_keys(table):
+    """Column-name tuples of the primary key and unique indexes of `table`."""
+    keys = [tuple(column.name for column in table.primary_key)]
+    keys.extend(tuple(column.name for column in index.columns) for index in table.indexes if index.unique)
+    keys.extend(tuple(column.name for column in constraint.columns) for constraint in table.constraints
+                if constraint.__visit_name__ == 'unique_constraint')
+    keys.extend((column.name,) for column in table.columns if column.unique)
+    return list(dict.fromkeys(key for key in keys if key))
+
+
+def _insert_missing(execute, table, rows):
+    # Portable path: drop rows whose unique keys already exist (or repeat an
+    # earlier row), insert the rest, then read their primary keys back. A
+    # concurrent insert of the same key still fails the statement here.
+    present = rows[0].keys()
+    keys = [key for key in _unique_keys(table) if set(key) <= present]
+    for key in keys:
+        columns = [table.c[name] for name in key]
+        values = {tuple(row[name] for name in key) for row in rows}
+        taken = {tuple(found) for found in execute(select(*columns).where(tuple_(*columns).in_(values)))}
+        kept = []
+        for row in rows:
+            value = tuple(row[name] for name in key)
+            if value not in taken:
+                taken.add(value)
+                kept.append(row)
+        rows = kept
+    if not rows:
+        return []
+    execute(insert(table), rows)
+    if not keys:
+        return []
+    columns = [table.c[name] for name in keys[0]]
+    values = [tuple(row[name] for name in keys[0]) for row in rows]
+    return execute(select(*table.primary_key).where(tuple_(*columns).in_(values))).scalars().all()
+
+
+def insert_ignoring_conflicts(table, rows, connection=None):
+    """
+    Insert `rows` into `table`, skipping those that would violate its primary
+    key or a unique index instead of failing the batch, and return the primary
+    keys of the rows inserted. PostgreSQL and SQLite do it in one INSERT ...
+    ON CONFLICT DO NOTHING; other databases check for existing keys first.
+    Runs on `connection`, or the session.
+    """
+    if not rows:
+        return []
+    execute = (connection or db.session).execute
+    dialect = (connection.dialect if connection is not None else db.session.get_bind().dialect).name
+    if dialect not in ('postgresql', 'sqlite'):
+        return _insert_missing(execute, table, rows)
+    dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    statement = dialect_insert(table).on_conflict_do_nothing().returning(*table.primary_key)
+    return execute(statement, rows).scalars().all()
@@ -0,0 +1,295 @@
+# Read-through response cache for hot, rarely-written listings.
+#
+# Views decorated with @cached(namespace) store their serialised JSON body
+# under "<namespace>:<generation>:<endpoint>:<query args>". A write calls
+# invalidate(namespace), which bumps the namespace's generation: every cached
+# page of that namespace becomes unreachable at once, without scanning keys,
+# and a computation that started before the write stores its result under the
+# old generation where nobody will read it.
+#
+# CACHE_BACKEND picks the store:
+#   "local"  in-process LRU bounded by CACHE_MAX_BYTES (the default). Each
+#            worker process has its own copy and its own generations, so a
+#            write on one worker would leave the others serving stale pages
+#            until CACHE_TTL: single-process development only. `flask serve`
+#            refuses it with more than one worker.
+#   "redis"  shared Redis at CACHE_URL (needs the optional `redis` package).
+#   "none"   no caching, for multi-worker deployments without a shared store.
+#   "module:Class"  any class taking the app config and implementing the
+#            LocalCache interface.
+#
+# A cold key is computed once per process (other threads wait for the first
+# one), and once across processes for shared stores via an add-if-absent
+# lock key. Requests whose WSGI environ sets BYPASS_CACHE_ENVIRON_KEY neither
+# read nor store cached responses (consistent batches, see api.batch).
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, request, current_app
+from werkzeug.utils import import_string
+
+from api.metrics import define_counter, increment
+from api.serialize import negotiate
+from api.streaming import wants_stream
+
+define_counter('response_cache_requests_total', "Cacheable requests, by endpoint and cache outcome.")
+
+
+class LocalCache:
+    """
+    In-process LRU of bytes values, evicting least recently used entries once
+    the stored keys and values exceed `max_bytes`. Also the stand-in for a
+    shared store in tests.
+    """
+    shared = False
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self.size -= len(key) + len(value)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if len(key) + len(value) > self.max_bytes:
+                return
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self.size += len(key) + len(value)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def add(self, key, value, ttl):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return False
+        self.set(key, value, ttl)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    # Generations live outside the LRU: evicting one would resurrect entries
+    # cached under an older generation.
+    def generation(self, namespace):
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+            self.size = 0
+
+
+class NullCache:
+    """
+    Stores nothing: every request computes its response.
+    """
+    shared = False
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def add(self, key, value, ttl):
+        return True
+
+    def delete(self, key):
+        pass
+
+    def generation(self, namespace):
+        return 0
+
+    def bump(self, namespace):
+        pass
+
+
+class RedisCache:
+    """
+    Shared cache in Redis, so every worker sees the same entries and
+    invalidations.
+    """
+    shared = True
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._redis.get(key)
+
+    def set(self, key, value, ttl):
+        self._redis.set(key, value, ex=max(1, int(ttl)))
+
+    def add(self, key, value, ttl):
+        return bool(self._redis.set(key, value, ex=max(1, int(ttl)), nx=True))
+
+    def delete(self, key):
+        self._redis.delete(key)
+
+    def generation(self, namespace):
+        return int(self._redis.get(f"generation:{namespace}") or 0)
+
+    def bump(self, namespace):
+        self._redis.incr(f"generation:{namespace}")
+
+
+def create_backend(config):
+    backend = config['CACHE_BACKEND']
+    if backend == 'local':
+        return LocalCache(config['CACHE_MAX_BYTES'])
+    if backend == 'redis':
+        return RedisCache(config['CACHE_URL'])
+    if backend == 'none':
+        return NullCache()
+    return import_string(backend.replace(':', '.'))(config)
+
+
+BYPASS_CACHE_ENVIRON_KEY = 'api.cache.bypass'
+
+
+def _backend():
+    return current_app.extensions['response_cache']
+
+
+# In-process single flight: key -> lock held by the thread computing it.
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _flight_lock(key):
+    with _flights_lock:
+        return _flights.setdefault(key, threading.Lock())
+
+
+def _wait_for(backend, key, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+        value = backend.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def get_or_compute(key, compute, ttl):
+    """
+    Return the cached value of `key`, computing and storing it with `compute`
+    on a miss. Concurrent misses on one key run `compute` only once. A
+    `compute` returning None is not stored. Returns (value, hit).
+    """
+    backend = _backend()
+    value = backend.get(key)
+    if value is not None:
+        return value, True
+
+    lock = _flight_lock(key)
+    with lock:
+        try:
+            value = backend.get(key)
+            if value is not None:
+                return value, True
+
+            lock_timeout = current_app.config['CACHE_LOCK_TIMEOUT']
+            if backend.shared and not backend.add(f"lock:{key}", b'1', lock_timeout):
+                # Another process is computing it; fall back to computing
+                # here if it doesn't finish in time.
+                value = _wait_for(backend, key, lock_timeout)
+                if value is not None:
+                    return value, True
+            try:
+                value = compute()
+                if value is not None:
+                    backend.set(key, value, ttl)
+            finally:
+                if backend.shared:
+                    backend.delete(f"lock:{key}")
+            return value, False
+        finally:
+            with _flights_lock:
+                if _flights.get(key) is lock:
+                    del _flights[key]
+
+
+def invalidate(namespace):
+    """
+    Drop every cached response in `namespace`. Call after the write commits.
+    """
+    _backend().bump(namespace)
+
+
+def cached(namespace):
+    """
+    Cache a view's 200 responses, separately for each representation
+    api.serialize negotiates. `namespace` is a string, or a callable taking
+    the view's arguments and returning one, naming what the response depends
+    on so writes can invalidate() it. Streamed responses, and requests that
+    set BYPASS_CACHE_ENVIRON_KEY, bypass the cache.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorated_function(*args, **kwargs):
+            if wants_stream() or request.environ.get(BYPASS_CACHE_ENVIRON_KEY):
+                return fn(*args, **kwargs)
+
+            name = namespace(*args, **kwargs) if callable(namespace) else namespace
+            params = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+            mimetype = negotiate(request.accept_mimetypes)
+            key = f"{name}:{_backend().generation(name)}:{request.endpoint}:{mimetype}:{params}"
+            uncached = []
+
+            def compute():
+                response = current_app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    uncached.append(response)
+                    return None
+                return response.get_data()
+
+            body, hit = get_or_compute(key, compute, current_app.config['CACHE_TTL'])
+            if body is None:
+                increment('response_cache_requests_total', endpoint=request.endpoint, outcome='bypass')
+                return uncached[0]
+
+            increment('response_cache_requests_total', endpoint=request.endpoint, outcome='hit' if hit else 'miss')
+            response = Response(body, mimetype=mimetype)
+            response.vary.add('Accept')
+            response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+            return response
+        return decorated_function
+    return wrapper
+
+
+def register_cache(app):
+    app.extensions['response_cache'] = create_backend(app.config)
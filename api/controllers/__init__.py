@@ -4,6 +4,7 @@ from .enrollment_controller import enrollment_bp
 from .assignment_controller import assignment_bp
 from .grade_controller import grade_bp
 from .auth_controller import auth_bp
+from api.routes import routes
 
 def register_blueprints(app):
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -11,4 +12,6 @@ def register_blueprints(app):
     app.register_blueprint(course_bp, url_prefix='/courses')
     app.register_blueprint(enrollment_bp, url_prefix='/enrollments')
     app.register_blueprint(assignment_bp, url_prefix='/assignments')
-    app.register_blueprint(grade_bp, url_prefix='/grades')
\ No newline at end of file
+    app.register_blueprint(grade_bp, url_prefix='/grades')
+    # /api/student/history, /api/instructor/dashboard and /api/exports/gradebooks
+    app.register_blueprint(routes, url_prefix='/api')
\ No newline at end of file
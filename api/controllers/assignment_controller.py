@@ -1,7 +1,13 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required
 from api.models import db, Assignment
-from api.utils import role_required
+from api.utils import role_required, parse_date
+from api.jwt_cache import cached_jwt_required
+from api.pagination import paginate
+from api.streaming import wants_stream, stream_query
+from api.cache import cached, invalidate
+from api.stats import stats_namespace
+from api.fields import ASSIGNMENT_FIELDS, requested_fields, row_query
+from api.serialize import respond
 
 assignment_bp = Blueprint('assignment', __name__)
 
@@ -26,38 +32,55 @@ def create_assignment():
     data = request.json
     if not data or 'title' not in data or 'description' not in data or 'due_date' not in data or 'course_id' not in data:
         return jsonify({"message": "Invalid data provided"}), 400
+    due_date = parse_date(data['due_date'])
+    if due_date is None:
+        return jsonify({"message": "due_date must be a YYYY-MM-DD date"}), 400
 
     assignment = Assignment(
         title=data['title'],
         description=data['description'],
-        due_date=data['due_date'],
+        due_date=due_date,
         course_id=data['course_id']
     )
     db.session.add(assignment)
     db.session.commit()
+    invalidate(f"assignments:course:{assignment.course_id}")
+    invalidate(stats_namespace(assignment.course_id))
     return jsonify({"message": "Assignment created successfully!"}), 201
 
 # Get assignments for a course
 @assignment_bp.route('/course/<int:course_id>', methods=['GET'], endpoint='get_assignment')
-@jwt_required()
+@cached_jwt_required()
+@cached(lambda course_id: f"assignments:course:{course_id}")
 def get_course_assignments(course_id):
     """
-    Get assignments for a course. Endpoint: GET /assignments/course/<course_id>
-    Response:
-    [
-        {
-            "id": int,
-            "title": "Assignment Title",
-            "description": "Assignment Description",
-            "due_date": "YYYY-MM-DD"
-        },
-        ...
-    ]
+    Get assignments for a course. Endpoint: GET /assignments/course/<course_id>?limit=&after=&fields=
+    Pass ?stream=1 or `Accept: application/x-ndjson` to stream every assignment
+    instead of a single page, and ?fields=id,title,due_date to leave out the
+    other fields. Pages are served from the response cache until
+    an assignment is added to the course.
+    Response (JSON, or MessagePack for `Accept: application/msgpack`):
+    {
+        "items": [
+            {
+                "id": int,
+                "title": "Assignment Title",
+                "description": "Assignment Description",
+                "due_date": "YYYY-MM-DD"
+            },
+            ...
+        ],
+        "next_cursor": str or null
+    }
     """
-    assignments = Assignment.query.filter_by(course_id=course_id).all()
-    return jsonify([{
-        "id": assignment.id,
-        "title": assignment.title,
-        "description": assignment.description,
-        "due_date": assignment.due_date.isoformat() if assignment.due_date else None
-    } for assignment in assignments]), 200
\ No newline at end of file
+    fields = requested_fields(ASSIGNMENT_FIELDS)
+    query, serialize = row_query(Assignment, fields)
+    query = query.filter(Assignment.course_id == course_id)
+    if wants_stream():
+        return stream_query(query, Assignment.id, serialize)
+
+    assignments, next_cursor = paginate(query, Assignment.id)
+    return respond({
+        "items": [serialize(assignment) for assignment in assignments],
+        "next_cursor": next_cursor
+    })
\ No newline at end of file
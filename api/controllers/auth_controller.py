@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from api.models import db, User
+from api.jwt_cache import forget_token
+from api.revocation import revoke
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -67,6 +69,10 @@ def login():
 
     user = User.query.filter_by(email=data['email']).first()
     if user and user.check_password(data['password']):
+        # Transparently move old hashes to the current PASSWORD_HASH_METHOD
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+            db.session.commit()
         token = create_access_token(
             identity=str(user.id),
             additional_claims={"role": user.role}
@@ -76,12 +82,13 @@ def login():
     return jsonify({"error": "Invalid credentials"}), 401
 
 
-# Logout user (if implemented with token revocation)
+# Logout user by revoking the presented token
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
     """
-    Logout the user (requires valid JWT token).
+    Logout the user (requires valid JWT token). The token is revoked and
+    rejected on every later request until it expires.
     Endpoint: POST /auth/logout
     Response:
     {
@@ -89,4 +96,6 @@ def logout():
     }
     """
     user_id = get_jwt_identity()
+    revoke(get_jwt())
+    forget_token()
     return jsonify({"message": f"User {user_id} logged out successfully!"}), 200
\ No newline at end of file
@@ -1,12 +1,32 @@
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from flask_jwt_extended import get_jwt_identity
 from api.models import db, Course
 from api.utils import role_required
+from api.jwt_cache import cached_jwt_required
+from api.pagination import paginate
+from api.streaming import wants_stream, stream_query
+from api.cache import cached, invalidate
+from api.versions import versioned
+from api.stats import course_grade_stats, stats_namespace
+from api.fields import COURSE_FIELDS, requested_fields, row_query
+from api.serialize import respond
+from api.gradebook import FORMATS, iter_gradebook, parquet_available
 
 course_bp = Blueprint('course', __name__)
 
+
+def _course_owner_error(course_id, action):
+    """None if the caller teaches the course, else the 404/403 response."""
+    course = db.session.get(Course, course_id)
+    if not course:
+        return jsonify({"message": "Course not found"}), 404
+    if course.instructor_id != int(get_jwt_identity()):
+        return jsonify({"message": f"Only the course's instructor can {action}"}), 403
+    return None
+
+
 @course_bp.route('/test-token', methods=['GET'])
-@jwt_required()
+@cached_jwt_required()
 def test_token():
     """
     Test token validation. Endpoint: GET /test-token
@@ -52,30 +72,45 @@ def create_course():
     )
     db.session.add(course)
     db.session.commit()
+    invalidate('courses')
     return jsonify({"message": "Course created successfully!"}), 201
 
 # Get all courses
 @course_bp.route('/list', methods=['GET'], endpoint='get_all_courses')
-@jwt_required()
+@cached_jwt_required()
+@versioned('courses')
+@cached('courses')
 def get_courses():
     """
-    Get all courses. Endpoint: GET /courses/list
-    Response:
-    [
-        {
-            "id": int,
-            "name": "Course Name",
-            "description": "Course Description"
-        },
-        ...
-    ]
+    Get all courses. Endpoint: GET /courses/list?limit=&after=&fields=
+    Pass ?stream=1 or `Accept: application/x-ndjson` to stream every course
+    instead of a single page, and ?fields=id,name to leave out the other
+    fields. Pages are served from the response cache until
+    a course is created or updated, and carry an ETag; a matching
+    If-None-Match gets 304 Not Modified.
+    Response (JSON, or MessagePack for `Accept: application/msgpack`):
+    {
+        "items": [
+            {
+                "id": int,
+                "name": "Course Name",
+                "description": "Course Description"
+            },
+            ...
+        ],
+        "next_cursor": str or null
+    }
     """
-    courses = Course.query.all()
-    return jsonify([{
-        "id": course.id,
-        "name": course.name,
-        "description": course.description
-    } for course in courses]), 200
+    fields = requested_fields(COURSE_FIELDS)
+    query, serialize = row_query(Course, fields)
+    if wants_stream():
+        return stream_query(query, Course.id, serialize)
+
+    courses, next_cursor = paginate(query, Course.id)
+    return respond({
+        "items": [serialize(course) for course in courses],
+        "next_cursor": next_cursor
+    })
 
 # Update a course
 @course_bp.route('/update/<int:course_id>', methods=['PUT'], endpoint='update_course')
@@ -101,4 +136,69 @@ def update_course(course_id):
     course.name = data.get('name', course.name)
     course.description = data.get('description', course.description)
     db.session.commit()
-    return jsonify({"message": "Course updated successfully!"}), 200
\ No newline at end of file
+    invalidate('courses')
+    return jsonify({"message": "Course updated successfully!"}), 200
+
+# Get grade statistics for a course
+@course_bp.route('/<int:course_id>/stats', methods=['GET'], endpoint='get_course_stats')
+@role_required('instructor')
+def get_course_stats(course_id):
+    """
+    Get grade statistics for a course and each of its assignments, computed
+    by the database. Endpoint: GET /courses/<course_id>/stats (Instructor only)
+    Only the course's instructor may read them. Cached until grades or
+    assignments of the course change.
+    Response (JSON, or MessagePack for `Accept: application/msgpack`):
+    {
+        "course_id": int,
+        "course": {
+            "count": int,
+            "mean": float or null,
+            "median": float or null,
+            "stddev": float or null,
+            "min": float or null,
+            "max": float or null,
+            "percentiles": {"p10": float or null, "p25": ..., "p75": ..., "p90": ...},
+            "histogram": [{"min": 0, "max": 10, "count": int}, ...]
+        },
+        "assignments": [
+            {"assignment_id": int, "title": str, "count": int, ...same fields as "course"},
+            ...
+        ]
+    }
+    """
+    error = _course_owner_error(course_id, "view its grade statistics")
+    if error:
+        return error
+    return _course_stats(course_id)
+
+
+# Checked for ownership before the cache is consulted.
+@cached(stats_namespace)
+def _course_stats(course_id):
+    return respond(course_grade_stats(course_id))
+
+# Export a course's gradebook
+@course_bp.route('/<int:course_id>/gradebook.<any(csv, parquet):fmt>', methods=['GET'], endpoint='get_course_gradebook')
+@role_required('instructor')
+def get_course_gradebook(course_id, fmt):
+    """
+    Export a course's grades as a student x assignment matrix.
+    Endpoint: GET /courses/<course_id>/gradebook.csv or .parquet (Instructor only)
+    One row per enrolled student, streamed as it is read from the database.
+    Columns: student_id, student_name, student_email, then one per assignment
+    in id order, named "<title> (#<assignment id>)" and empty where the
+    student has no grade. Only the course's instructor may export it.
+    Parquet needs pyarrow installed (501 otherwise).
+    Response: the file, as an attachment
+    """
+    error = _course_owner_error(course_id, "export its gradebook")
+    if error:
+        return error
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({"message": "Parquet export is not available on this server"}), 501
+    return Response(
+        stream_with_context(iter_gradebook(course_id, fmt)),
+        mimetype=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="course-{course_id}-gradebook.{fmt}"'}
+    )
@@ -1,10 +1,18 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from api.models import db, Enrollment
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import get_jwt_identity
+from api.models import db, Enrollment, Course, User
 from api.utils import role_required
+from api.pagination import paginate
+from api.streaming import wants_stream, stream_query
+from api.summary import record_enrollments
+from api.bulk import chunked, insert_ignoring_conflicts
+from api.versions import versioned
+from api.fields import ENROLLMENT_FIELDS, requested_fields, row_query
+from api.serialize import respond
 
 enrollment_bp = Blueprint('enrollment', __name__)
 
+
 # Enroll in a course
 @enrollment_bp.route('/enroll', methods=['POST'], endpoint='create_enroll')
 @role_required('student')
@@ -30,27 +38,105 @@ def enroll_in_course():
         course_id=data['course_id']
     )
     db.session.add(enrollment)
+    db.session.flush()
+    record_enrollments([enrollment.id])
     db.session.commit()
     return jsonify({"message": "Enrolled successfully!"}), 201
 
+# Enroll many students in a course
+@enrollment_bp.route('/bulk', methods=['POST'], endpoint='create_bulk_enroll')
+@role_required('instructor')
+def bulk_enroll():
+    """
+    Enroll students in a course in bulk. Endpoint: POST /enrollments/bulk (Instructor only)
+    Only the course's own instructor may enroll students in it.
+    Expects JSON, where students are user ids or emails:
+    {
+        "course_id": int,
+        "students": [int or "email", ...]
+    }
+    Response:
+    {
+        "created": int,
+        "skipped": int,
+        "unknown": int
+    }
+    """
+    data = request.json
+    if not data or 'course_id' not in data or not isinstance(data.get('students'), list):
+        return jsonify({"message": "Invalid data provided"}), 400
+
+    course = db.session.get(Course, data['course_id'])
+    if not course:
+        return jsonify({"message": "Course not found"}), 404
+    if course.instructor_id != int(get_jwt_identity()):
+        return jsonify({"message": "Only the course's instructor can enroll students in it"}), 403
+
+    ids, emails = set(), set()
+    for student in data['students']:
+        if isinstance(student, str) and '@' in student:
+            emails.add(student.strip().lower())
+        else:
+            try:
+                ids.add(int(student))
+            except (TypeError, ValueError):
+                return jsonify({"message": f"Invalid student reference: {student!r}"}), 400
+
+    found = db.session.query(User.id, User.email).filter(
+        User.role == 'student',
+        User.id.in_(ids) | db.func.lower(User.email).in_(emails)
+    ).all()
+    student_ids = sorted({student.id for student in found})
+    known = {student.id for student in found} | {student.email.lower() for student in found}
+    unknown = len(ids - known) + len(emails - known)
+
+    created = 0
+    for chunk in chunked(student_ids, current_app.config['BULK_CHUNK_SIZE']):
+        enrollment_ids = insert_ignoring_conflicts(
+            Enrollment.__table__, [{"student_id": student_id, "course_id": course.id} for student_id in chunk]
+        )
+        record_enrollments(enrollment_ids)
+        db.session.commit()
+        created += len(enrollment_ids)
+
+    return jsonify({
+        "created": created,
+        "skipped": len(student_ids) - created,
+        "unknown": unknown
+    }), 200
+
 # Get student enrollments
 @enrollment_bp.route('/list', methods=['GET'], endpoint='get_student_enrollments')
 @role_required('student')
+@versioned('enrollments')
 def get_student_enrollments():
     """
-    Get student enrollments. Endpoint: GET /enrollments/list (Student only)
-    Response:
-    [
-        {
-            "course_id": int,
-            "enrolled_date": "YYYY-MM-DD"
-        },
-        ...
-    ]
+    Get student enrollments. Endpoint: GET /enrollments/list?limit=&after=&fields= (Student only)
+    Pass ?stream=1 or `Accept: application/x-ndjson` to stream every enrollment
+    instead of a single page, and ?fields=course_id to leave out the other
+    fields. Responses carry an ETag; a matching
+    If-None-Match gets 304 Not Modified.
+    Response (JSON, or MessagePack for `Accept: application/msgpack`):
+    {
+        "items": [
+            {
+                "course_id": int,
+                "enrolled_date": "YYYY-MM-DD"
+            },
+            ...
+        ],
+        "next_cursor": str or null
+    }
     """
     student_id = get_jwt_identity()
-    enrollments = Enrollment.query.filter_by(student_id=student_id).all()
-    return jsonify([{
-        "course_id": enrollment.course_id,
-        "enrolled_date": enrollment.enrolled_date.isoformat() if enrollment.enrolled_date else None
-    } for enrollment in enrollments]), 200
\ No newline at end of file
+    fields = requested_fields(ENROLLMENT_FIELDS)
+    query, serialize = row_query(Enrollment, fields)
+    query = query.filter(Enrollment.student_id == student_id)
+    if wants_stream():
+        return stream_query(query, Enrollment.id, serialize)
+
+    enrollments, next_cursor = paginate(query, Enrollment.id)
+    return respond({
+        "items": [serialize(enrollment) for enrollment in enrollments],
+        "next_cursor": next_cursor
+    })
\ No newline at end of file
@@ -1,16 +1,124 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required
-from api.models import db, Grade
+import math
+import time
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from api.models import db, Grade, Assignment, Course, Enrollment
 from api.utils import role_required
+from api.pagination import paginate
+from api.streaming import wants_stream, stream_query
+from api.summary import record_grades, is_enrolled
+from api.bulk import read_rows, chunked
+from api.stats import invalidate_course_stats
+from api.fields import GRADE_FIELDS, requested_fields, row_query
+from api.serialize import respond
 
 grade_bp = Blueprint('grade', __name__)
 
+
+def _parse_grade(value):
+    """`value` as a float grade; ValueError unless it is a finite number."""
+    grade = float(value)
+    if not math.isfinite(grade):
+        raise ValueError("grade must be a finite number")
+    return grade
+
+
+def _parse_grade_row(row):
+    return {
+        "assignment_id": int(row['assignment_id']),
+        "student_id": int(row['student_id']),
+        "grade": _parse_grade(row['grade'])
+    }
+
+
+def _insert_grades(rows):
+    """
+    Insert a chunk of validated rows and update the summaries. If the set
+    insert fails (a concurrent import of the same grades), retry the chunk one
+    row at a time so only the offending rows are rejected. Commits; returns
+    (inserted ids, per-row errors).
+    """
+    try:
+        grade_ids = db.session.execute(
+            insert(Grade).returning(Grade.id), [row for _, row in rows]
+        ).scalars().all()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Bulk grade chunk failed, retrying row by row: {e}")
+        grade_ids, errors = [], []
+        for number, row in rows:
+            try:
+                with db.session.begin_nested():
+                    grade_ids.append(db.session.execute(insert(Grade).returning(Grade.id), row).scalar_one())
+            except SQLAlchemyError:
+                errors.append({"row": number, "error": "Rejected by the database"})
+    else:
+        errors = []
+    record_grades(grade_ids)
+    db.session.commit()
+    return grade_ids, errors
+
+
+def _owned_assignments(instructor_id, assignment_ids):
+    """The ids among `assignment_ids` of assignments in the instructor's courses."""
+    return set(db.session.execute(
+        db.select(Assignment.id).join(
+            Course, Course.id == Assignment.course_id
+        ).where(
+            Assignment.id.in_(assignment_ids),
+            Course.instructor_id == instructor_id
+        )
+    ).scalars())
+
+
+def _validate_grade_rows(rows, instructor_id):
+    """
+    Check a chunk of parsed rows against the instructor's courses,
+    enrollments and existing grades with one query each. Returns (valid rows,
+    per-row errors).
+    """
+    assignment_ids = {row['assignment_id'] for _, row in rows}
+    student_ids = {row['student_id'] for _, row in rows}
+    owned = _owned_assignments(instructor_id, assignment_ids)
+    enrolled = {tuple(pair) for pair in db.session.query(
+        Assignment.id, Enrollment.student_id
+    ).join(
+        Enrollment, Enrollment.course_id == Assignment.course_id
+    ).filter(
+        Assignment.id.in_(assignment_ids),
+        Enrollment.student_id.in_(student_ids)
+    )}
+    graded = {tuple(pair) for pair in db.session.query(
+        Grade.assignment_id, Grade.student_id
+    ).filter(
+        Grade.assignment_id.in_(assignment_ids),
+        Grade.student_id.in_(student_ids)
+    )}
+
+    valid, errors = [], []
+    for number, row in rows:
+        pair = (row['assignment_id'], row['student_id'])
+        if row['assignment_id'] not in owned:
+            errors.append({"row": number, "error": "Assignment is not in one of your courses"})
+        elif pair not in enrolled:
+            errors.append({"row": number, "error": "Student is not enrolled in the assignment's course"})
+        elif pair in graded:
+            errors.append({"row": number, "error": "Student already has a grade for this assignment"})
+        else:
+            graded.add(pair)
+            valid.append((number, row))
+    return valid, errors
+
 # Assign a grade to a student
 @grade_bp.route('/assign', methods=['POST'], endpoint='create_assign')
 @role_required('instructor')
 def assign_grade():
     """
     Assign a grade to a student. Endpoint: POST /grades/assign (Instructor only)
+    The assignment must be in one of the caller's courses and the student
+    enrolled in it.
     Expects JSON:
     {
         "assignment_id": int,
@@ -25,12 +133,120 @@ def assign_grade():
     data = request.json
     if not data or 'assignment_id' not in data or 'student_id' not in data or 'grade' not in data:
         return jsonify({"message": "Invalid data provided"}), 400
+    try:
+        value = _parse_grade(data['grade'])
+    except (TypeError, ValueError):
+        return jsonify({"message": "grade must be a finite number"}), 400
+    if not _owned_assignments(int(get_jwt_identity()), [data['assignment_id']]):
+        return jsonify({"message": "Only the course's instructor can grade its assignments"}), 403
+    if not is_enrolled(data['student_id'], data['assignment_id']):
+        return jsonify({"message": "Student is not enrolled in the assignment's course"}), 400
 
     grade = Grade(
         assignment_id=data['assignment_id'],
         student_id=data['student_id'],
-        grade=data['grade']
+        grade=value
     )
     db.session.add(grade)
+    db.session.flush()
+    record_grades([grade.id])
     db.session.commit()
-    return jsonify({"message": "Grade assigned successfully!"}), 201
\ No newline at end of file
+    invalidate_course_stats([grade.assignment_id])
+    return jsonify({"message": "Grade assigned successfully!"}), 201
+
+# Assign many grades in one request
+@grade_bp.route('/bulk', methods=['POST'], endpoint='create_bulk')
+@role_required('instructor')
+def bulk_assign_grades():
+    """
+    Assign grades in bulk. Endpoint: POST /grades/bulk (Instructor only)
+    Expects a JSON array:
+    [
+        {"assignment_id": int, "student_id": int, "grade": float},
+        ...
+    ]
+    or a `text/csv` body with an `assignment_id,student_id,grade` header.
+    Rows for assignments outside the caller's courses are rejected.
+    Rows are validated and inserted BULK_CHUNK_SIZE at a time, each chunk in
+    its own transaction; bad rows (including grades that are not finite
+    numbers) are reported and skipped.
+    Response:
+    {
+        "inserted": int,
+        "failed": int,
+        "errors": [{"row": int, "error": str}, ...],
+        "elapsed_seconds": float,
+        "rows_per_second": float
+    }
+    """
+    started = time.perf_counter()
+    instructor_id = int(get_jwt_identity())
+    inserted, errors = 0, []
+
+    for chunk in chunked(read_rows(), current_app.config['BULK_CHUNK_SIZE']):
+        rows = []
+        for number, raw in chunk:
+            try:
+                rows.append((number, _parse_grade_row(raw)))
+            except (KeyError, TypeError, ValueError):
+                errors.append({"row": number, "error": "Expected assignment_id, student_id and a finite numeric grade"})
+        if not rows:
+            continue
+
+        valid, rejected = _validate_grade_rows(rows, instructor_id)
+        errors.extend(rejected)
+        if not valid:
+            continue
+
+        grade_ids, rejected = _insert_grades(valid)
+        errors.extend(rejected)
+        invalidate_course_stats([row['assignment_id'] for _, row in valid])
+        inserted += len(grade_ids)
+
+    errors.sort(key=lambda error: error["row"])
+    elapsed = time.perf_counter() - started
+    rows_per_second = inserted / elapsed if elapsed else 0.0
+    current_app.logger.info(f"Bulk grade import: {inserted} rows in {elapsed:.3f}s ({rows_per_second:.0f} rows/s)")
+    return jsonify({
+        "inserted": inserted,
+        "failed": len(errors),
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows_per_second, 1)
+    }), 200
+
+# Get grades for an assignment
+@grade_bp.route('/assignment/<int:assignment_id>', methods=['GET'], endpoint='get_assignment_grades')
+@role_required('instructor')
+def get_assignment_grades(assignment_id):
+    """
+    Get grades for an assignment. Endpoint: GET /grades/assignment/<assignment_id>?limit=&after=&fields= (Instructor only)
+    Pass ?stream=1 or `Accept: application/x-ndjson` to stream every grade
+    instead of a single page, and ?fields=student_id,grade to leave out the
+    other fields.
+    Response (JSON, or MessagePack for `Accept: application/msgpack`):
+    {
+        "items": [
+            {
+                "id": int,
+                "assignment_id": int,
+                "student_id": int,
+                "grade": float,
+                "graded_date": "YYYY-MM-DD"
+            },
+            ...
+        ],
+        "next_cursor": str or null
+    }
+    """
+    fields = requested_fields(GRADE_FIELDS)
+    query, serialize = row_query(Grade, fields)
+    query = query.filter(Grade.assignment_id == assignment_id)
+    if wants_stream():
+        return stream_query(query, Grade.id, serialize)
+
+    grades, next_cursor = paginate(query, Grade.id)
+    return respond({
+        "items": [serialize(grade) for grade in grades],
+        "next_cursor": next_cursor
+    })
\ No newline at end of file
@@ -1,45 +1,59 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from api.models import db, User
 from api.utils import role_required
+from api.jwt_cache import cached_jwt_required
+from api.pagination import paginate
+from api.streaming import wants_stream, stream_query
+from api.fields import USER_FIELDS, requested_fields, row_query
+from api.serialize import respond
 
 # Define the user blueprint
 user_bp = Blueprint('user', __name__)
 
+
 # Get all users (Instructor only)
 @user_bp.route('/', methods=['GET'], endpoint='get_all_user')
 @role_required('instructor')
 def get_all_users():
     """
-    Get all users. Endpoint: GET /users (Instructor only)
-    Response:
-    [
-        {
-            "id": int,
-            "name": str,
-            "email": str,
-            "phone": str,
-            "role": str
-        },
-        ...
-    ]
+    Get all users. Endpoint: GET /users?limit=&after= (Instructor only)
+    Pass ?stream=1 or `Accept: application/x-ndjson` to stream every user
+    instead of a single page, and ?fields=id,name to return only those
+    fields.
+    Response (JSON, or MessagePack for `Accept: application/msgpack`):
+    {
+        "items": [
+            {
+                "id": int,
+                "name": str,
+                "email": str,
+                "phone": str,
+                "role": str
+            },
+            ...
+        ],
+        "next_cursor": str or null
+    }
     """
-    users = User.query.all()
-    return jsonify([{
-        "id": user.id,
-        "name": user.name,
-        "email": user.email,
-        "phone": user.phone,
-        "role": user.role
-    } for user in users]), 200
+    fields = requested_fields(USER_FIELDS)
+    query, serialize = row_query(User, fields)
+    if wants_stream():
+        return stream_query(query, User.id, serialize)
+
+    users, next_cursor = paginate(query, User.id)
+    return respond({
+        "items": [serialize(user) for user in users],
+        "next_cursor": next_cursor
+    })
 
 # Get a user by ID
 @user_bp.route('/<int:user_id>', methods=['GET'], endpoint='get_user_by_id')
-@jwt_required()
+@cached_jwt_required()
 def get_user(user_id):
     """
-    Get a user by ID. Endpoint: GET /users/<user_id>
-    Response:
+    Get a user by ID. Endpoint: GET /users/<user_id>?fields=
+    Response (JSON, or MessagePack for `Accept: application/msgpack`):
     {
         "id": int,
         "name": str,
@@ -48,16 +62,12 @@ def get_user(user_id):
         "role": str
     }
     """
-    user = User.query.get(user_id)
+    fields = requested_fields(USER_FIELDS)
+    query, serialize = row_query(User, fields)
+    user = query.filter(User.id == user_id).first()
     if not user:
         return jsonify({"message": "User not found"}), 404
-    return jsonify({
-        "id": user.id,
-        "name": user.name,
-        "email": user.email,
-        "phone": user.phone,
-        "role": user.role
-    }), 200
+    return respond(serialize(user))
 
 # Update a user by ID
 @user_bp.route('/<int:user_id>', methods=['PUT'], endpoint='update_user')
@@ -0,0 +1,97 @@
+from sqlalchemy import select, func, case
+
+from api.models import db, Course, Enrollment, Assignment, Grade
+
+# Upcoming assignments listed per course.
+UPCOMING_LIMIT = 5
+
+
+def instructor_dashboard(instructor_id, today):
+    """
+    Per-course overview of everything an instructor teaches, in two queries
+    whatever the number of courses: one joining per-course aggregates of
+    enrollments, assignments and grades, one listing the next UPCOMING_LIMIT
+    due assignments of every course with a window function.
+
+    "Ungraded" counts the grades still missing for assignments already due:
+    enrolled students x due assignments - grades recorded for them.
+    """
+    mine = select(Course.id).where(Course.instructor_id == instructor_id)
+    is_due = Assignment.due_date <= today
+
+    enrollments = select(
+        Enrollment.course_id,
+        func.count(Enrollment.id).label('enrollment_count'),
+    ).where(
+        Enrollment.course_id.in_(mine)
+    ).group_by(Enrollment.course_id).subquery()
+
+    assignments = select(
+        Assignment.course_id,
+        func.count(Assignment.id).label('assignment_count'),
+        func.sum(case((is_due, 1), else_=0)).label('due_count'),
+    ).where(
+        Assignment.course_id.in_(mine)
+    ).group_by(Assignment.course_id).subquery()
+
+    grades = select(
+        Assignment.course_id,
+        func.avg(Grade.grade).label('average_grade'),
+        func.sum(case((is_due, 1), else_=0)).label('graded_due_count'),
+    ).join(
+        Assignment, Assignment.id == Grade.assignment_id
+    ).where(
+        Assignment.course_id.in_(mine)
+    ).group_by(Assignment.course_id).subquery()
+
+    courses = db.session.execute(
+        select(
+            Course.id,
+            Course.name,
+            func.coalesce(enrollments.c.enrollment_count, 0).label('enrollment_count'),
+            func.coalesce(assignments.c.assignment_count, 0).label('assignment_count'),
+            func.coalesce(assignments.c.due_count, 0).label('due_count'),
+            func.coalesce(grades.c.graded_due_count, 0).label('graded_due_count'),
+            grades.c.average_grade,
+        ).outerjoin(
+            enrollments, enrollments.c.course_id == Course.id
+        ).outerjoin(
+            assignments, assignments.c.course_id == Course.id
+        ).outerjoin(
+            grades, grades.c.course_id == Course.id
+        ).where(
+            Course.instructor_id == instructor_id
+        ).order_by(Course.id)
+    ).all()
+
+    ranked = select(
+        Assignment.id,
+        Assignment.course_id,
+        Assignment.title,
+        Assignment.due_date,
+        func.row_number().over(
+            partition_by=Assignment.course_id, order_by=(Assignment.due_date, Assignment.id)
+        ).label('rn'),
+    ).where(
+        Assignment.course_id.in_(mine),
+        Assignment.due_date >= today
+    ).subquery()
+    upcoming = {}
+    for row in db.session.execute(
+        select(ranked).where(ranked.c.rn <= UPCOMING_LIMIT).order_by(ranked.c.course_id, ranked.c.rn)
+    ):
+        upcoming.setdefault(row.course_id, []).append({
+            "id": row.id,
+            "title": row.title,
+            "due_date": row.due_date
+        })
+
+    return [{
+        "id": course.id,
+        "name": course.name,
+        "enrollment_count": course.enrollment_count,
+        "assignment_count": course.assignment_count,
+        "ungraded_count": max(course.enrollment_count * course.due_count - course.graded_due_count, 0),
+        "average_grade": course.average_grade,
+        "upcoming_assignments": upcoming.get(course.id, [])
+    } for course in courses]
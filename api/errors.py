@@ -1,6 +1,8 @@
 from flask import jsonify
 from werkzeug.exceptions import HTTPException, BadRequest, Unauthorized
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import IntegrityError, OperationalError, TimeoutError as PoolTimeoutError
+
+QUERY_CANCELED = '57014'  # PostgreSQL SQLSTATE for statement_timeout
 
 def register_error_handlers(app):
     @app.errorhandler(HTTPException)
@@ -39,6 +41,27 @@ def register_error_handlers(app):
             "status_code": 409
         }), 409
 
+    @app.errorhandler(PoolTimeoutError)
+    def handle_pool_timeout(e):
+        response = jsonify({
+            "error": "Service Unavailable",
+            "message": "No database connection available, please retry shortly.",
+            "status_code": 503
+        })
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    @app.errorhandler(OperationalError)
+    def handle_operational_error(e):
+        sqlstate = getattr(e.orig, 'sqlstate', None) or getattr(e.orig, 'pgcode', None)
+        if sqlstate != QUERY_CANCELED:
+            return handle_general_exception(e)
+        return jsonify({
+            "error": "Service Unavailable",
+            "message": "The query took too long and was cancelled.",
+            "status_code": 503
+        }), 503
+
     @app.errorhandler(Exception)
     def handle_general_exception(e):
         return jsonify({
@@ -0,0 +1,70 @@
+# Sparse fieldsets: ?fields=id,name picks which fields a list or detail
+# endpoint returns. Names are checked against the fields the endpoint
+# serialises (all of them model columns) and turned into a column-level
+# select (row_query, or row_select on the async path), so the columns left
+# out are neither selected from the database nor sent.
+from flask import request
+from sqlalchemy import select
+from werkzeug.exceptions import BadRequest
+
+from api import db
+
+# Fields each resource serialises, in output order.
+USER_FIELDS = ('id', 'name', 'email', 'phone', 'role')
+COURSE_FIELDS = ('id', 'name', 'description')
+ENROLLMENT_FIELDS = ('course_id', 'enrolled_date')
+ASSIGNMENT_FIELDS = ('id', 'title', 'description', 'due_date')
+GRADE_FIELDS = ('id', 'assignment_id', 'student_id', 'grade', 'graded_date')
+
+
+def parse_fields(raw, available):
+    """
+    Turn a raw ?fields= value into the fields to return, in `available`
+    order. A missing value means all of them.
+    """
+    if raw is None:
+        return available
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    if not names:
+        raise BadRequest("fields must name at least one field")
+    unknown = names.difference(available)
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(available)}")
+    return tuple(name for name in available if name in names)
+
+
+def requested_fields(available):
+    """
+    Read ?fields= from the request.
+    """
+    return parse_fields(request.args.get('fields'), available)
+
+
+def _row_columns(model, fields):
+    key = model.__mapper__.primary_key[0].key
+    names = tuple(name for name in fields if name != key)
+    columns = (getattr(model, key), *(getattr(model, name) for name in names))
+    if key in fields:
+        names = (key, *names)
+        return columns, lambda row: dict(zip(names, row))
+    return columns, lambda row: dict(zip(names, row[1:]))
+
+
+def row_query(model, fields):
+    """
+    Query selecting just the columns behind `fields`, and a function mapping
+    each of its rows straight to the output dict - no ORM instances are
+    built. The primary key always leads the row, so keyset pagination can
+    read it back whether or not it was asked for.
+    """
+    columns, serialize = _row_columns(model, fields)
+    return db.session.query(*columns), serialize
+
+
+def row_select(model, fields):
+    """
+    row_query as a select() statement, for sessions other than db.session
+    (the async engine in api.asgi).
+    """
+    columns, serialize = _row_columns(model, fields)
+    return select(*columns), serialize
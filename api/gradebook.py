@@ -0,0 +1,384 @@
+# Gradebook exports: a course's grades pivoted into one row per enrolled
+# student and one column per assignment, as CSV or Parquet.
+#
+# The grades come from a single query ordered by student and read through
+# yield_per (a server-side cursor where the driver supports one). Rows are
+# pivoted as they arrive and written out STREAM_BATCH_SIZE students at a
+# time, so memory stays at one batch however large the course is. Parquet
+# output writes one row group per batch and needs pyarrow
+# (requirements-export.txt).
+#
+# Multi-course exports run on a background thread pool of EXPORT_WORKERS
+# threads and write one file per course under EXPORT_DIR/<export id>/, next
+# to a status.json that any worker on the host can read back. Exports started
+# over HTTP cover the requesting instructor's courses and belong to them; the
+# `flask export-gradebooks` command covers every course. Only one export per
+# owner and format is pending or running at a time; asking for another
+# returns that one. status.json records the host and pid
+# of the process running the export and a heartbeat it refreshes every
+# EXPORT_HEARTBEAT_INTERVAL seconds, so an export whose process was recycled
+# or killed is reported as failed instead of staying pending or running.
+import csv
+import fcntl
+import io
+import json
+import os
+import re
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+
+import click
+from flask import current_app
+from sqlalchemy import select
+
+from api.models import db, User, Course, Enrollment, Assignment, Grade
+
+FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+STUDENT_COLUMNS = ('student_id', 'student_name', 'student_email')
+_EXPORT_ID = re.compile(r'[0-9a-f]{32}')
+ACTIVE_STATUSES = ('pending', 'running')
+# A running export whose heartbeat is this many intervals old is lost.
+HEARTBEAT_MISSES = 3
+
+_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _assignments(course_id):
+    return db.session.execute(
+        select(Assignment.id, Assignment.title).where(Assignment.course_id == course_id).order_by(Assignment.id)
+    ).all()
+
+
+def _column_names(assignments):
+    # Titles are not unique within a course; the id keeps columns apart.
+    return [*STUDENT_COLUMNS, *(f"{assignment.title} (#{assignment.id})" for assignment in assignments)]
+
+
+def _student_batches(course_id, assignments, batch_size):
+    """
+    Yield lists of at most `batch_size` rows (student_id, name, email,
+    grade or None per assignment), one row per enrolled student in id order.
+    """
+    position = {assignment.id: index for index, assignment in enumerate(assignments)}
+    course_grades = select(
+        Grade.student_id, Grade.assignment_id, Grade.grade
+    ).join(
+        Assignment, Assignment.id == Grade.assignment_id
+    ).where(
+        Assignment.course_id == course_id
+    ).subquery()
+    result = db.session.execute(
+        select(
+            User.id, User.name, User.email, course_grades.c.assignment_id, course_grades.c.grade
+        ).join(
+            Enrollment, Enrollment.student_id == User.id
+        ).outerjoin(
+            course_grades, course_grades.c.student_id == User.id
+        ).where(
+            Enrollment.course_id == course_id
+        ).order_by(User.id),
+        execution_options={"yield_per": batch_size}
+    )
+
+    batch = []
+    for student_id, rows in groupby(result, key=lambda row: row.id):
+        grades = [None] * len(assignments)
+        for row in rows:
+            # Skips students without grades (NULL) and assignments created
+            # after the header was written.
+            if row.assignment_id in position:
+                grades[position[row.assignment_id]] = row.grade
+        batch.append((student_id, row.name, row.email, *grades))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_csv(course_id):
+    """Yield the course's gradebook as CSV text, one chunk per batch."""
+    assignments = _assignments(course_id)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(_column_names(assignments))
+    for batch in _student_batches(course_id, assignments, current_app.config['STREAM_BATCH_SIZE']):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only file that hands what pyarrow wrote back out through drain().
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(course_id):
+    """Yield the course's gradebook as Parquet bytes, one row group per batch."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    assignments = _assignments(course_id)
+    names = _column_names(assignments)
+    schema = pa.schema(
+        [(names[0], pa.int64()), (names[1], pa.string()), (names[2], pa.string())]
+        + [(name, pa.float64()) for name in names[len(STUDENT_COLUMNS):]]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in _student_batches(course_id, assignments, current_app.config['STREAM_BATCH_SIZE']):
+            columns = list(zip(*batch))
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_gradebook(course_id, fmt):
+    return iter_parquet(course_id) if fmt == 'parquet' else iter_csv(course_id)
+
+
+def export_course(course_id, fmt, path):
+    """Write one course's gradebook to `path`, replacing it only once complete."""
+    partial = path + '.part'
+    with open(partial, 'wb') as f:
+        for chunk in iter_gradebook(course_id, fmt):
+            f.write(chunk.encode() if isinstance(chunk, str) else chunk)
+    os.replace(partial, path)
+
+
+def _export_dir(export_id):
+    return os.path.join(current_app.config['EXPORT_DIR'], export_id)
+
+
+def _write_status(directory, status):
+    # Per writer: a reader may mark an export failed while it is written.
+    partial = os.path.join(directory, f'status.json.{os.getpid()}.{threading.get_ident()}.part')
+    with open(partial, 'w') as f:
+        json.dump(status, f)
+    os.replace(partial, os.path.join(directory, 'status.json'))
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _executor_for(app):
+    global _executor, _executor_pid
+    # Re-create after fork: threads do not survive into the child.
+    if _executor is None or _executor_pid != os.getpid():
+        with _lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=app.config['EXPORT_WORKERS'],
+                                               thread_name_prefix='gradebook-export')
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _heartbeat(save, stop, interval):
+    while not stop.wait(interval):
+        save()
+
+
+def run_institution_export(app, export_id, fmt):
+    """
+    Export the export's courses (the owner's, or all of them) into its
+    directory, updating status.json as it goes.
+    """
+    with app.app_context():
+        directory = _export_dir(export_id)
+        status = read_export_status(export_id)
+        status_lock = threading.Lock()
+
+        def save(**changes):
+            # Shared with the heartbeat thread.
+            with status_lock:
+                status.update(changes, heartbeat_at=_now())
+                _write_status(directory, status)
+
+        stop = threading.Event()
+        threading.Thread(
+            target=_heartbeat, args=(save, stop, app.config['EXPORT_HEARTBEAT_INTERVAL']),
+            name=f'gradebook-export-heartbeat-{export_id}', daemon=True
+        ).start()
+        try:
+            courses = select(Course.id).order_by(Course.id)
+            if status.get('instructor_id') is not None:
+                courses = courses.where(Course.instructor_id == status['instructor_id'])
+            course_ids = db.session.execute(courses).scalars().all()
+            save(status='running', pid=os.getpid(), host=socket.gethostname(), courses_total=len(course_ids))
+            for course_id in course_ids:
+                name = f"course-{course_id}.{fmt}"
+                export_course(course_id, fmt, os.path.join(directory, name))
+                # Release the connection between courses rather than holding
+                # one for the whole export.
+                db.session.remove()
+                save(courses_done=status['courses_done'] + 1, files=[*status['files'], name])
+            save(status='done', finished_at=_now())
+        except Exception as e:
+            app.logger.exception(f"Gradebook export {export_id} failed")
+            save(status='failed', error=str(e), finished_at=_now())
+        finally:
+            stop.set()
+
+
+@contextmanager
+def _exports_locked():
+    # Serialises starting exports across the threads and processes of the host.
+    root = current_app.config['EXPORT_DIR']
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def _active_export(fmt, instructor_id):
+    for name in sorted(os.listdir(current_app.config['EXPORT_DIR'])):
+        status = read_export_status(name)
+        if (status is not None and status['format'] == fmt and status['status'] in ACTIVE_STATUSES
+                and status.get('instructor_id') == instructor_id):
+            return status
+    return None
+
+
+def _create_export(fmt, instructor_id=None):
+    export_id = uuid.uuid4().hex
+    directory = _export_dir(export_id)
+    os.makedirs(directory)
+    status = {
+        "id": export_id,
+        "format": fmt,
+        "status": 'pending',
+        "instructor_id": instructor_id,
+        "courses_total": None,
+        "courses_done": 0,
+        "files": [],
+        "error": None,
+        "started_at": _now(),
+        "finished_at": None,
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "heartbeat_at": _now()
+    }
+    _write_status(directory, status)
+    return status
+
+
+def start_institution_export(fmt, instructor_id):
+    """
+    Queue an export of the gradebooks of the instructor's courses and return
+    its initial status. The export runs on a background thread of this
+    process. While the instructor has an export in `fmt` pending or running,
+    its status is returned instead.
+    """
+    app = current_app._get_current_object()
+    with _exports_locked():
+        status = _active_export(fmt, instructor_id)
+        if status is not None:
+            return status
+        status = _create_export(fmt, instructor_id)
+    _executor_for(app).submit(run_institution_export, app, status['id'], fmt)
+    return status
+
+
+def _process_exited(host, pid):
+    # Only answerable for processes on this host.
+    if host != socket.gethostname():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def _lost_reason(status):
+    if _process_exited(status['host'], status['pid']):
+        return f"Export process {status['pid']} exited before the export finished"
+    stale = timedelta(seconds=HEARTBEAT_MISSES * current_app.config['EXPORT_HEARTBEAT_INTERVAL'])
+    if status['status'] == 'running' and datetime.fromisoformat(status['heartbeat_at']) < datetime.now(timezone.utc) - stale:
+        return f"Export process {status['pid']} on {status['host']} stopped reporting progress"
+    return None
+
+
+def read_export_status(export_id):
+    """
+    The export's status.json, or None for an unknown id. A pending or
+    running export whose process is gone is marked failed.
+    """
+    if not _EXPORT_ID.fullmatch(export_id):
+        return None
+    directory = _export_dir(export_id)
+    try:
+        with open(os.path.join(directory, 'status.json')) as f:
+            status = json.load(f)
+    except FileNotFoundError:
+        return None
+    if status['status'] in ACTIVE_STATUSES:
+        reason = _lost_reason(status)
+        if reason is not None:
+            status.update(status='failed', error=reason, finished_at=_now())
+            _write_status(directory, status)
+    return status
+
+
+def export_file(status, name):
+    """Path of the finished file `name` of an export, or None if it has no such file."""
+    if name not in status.get('files', []):
+        return None
+    return os.path.abspath(os.path.join(_export_dir(status['id']), name))
+
+
+def register_gradebook_export(app):
+    @app.cli.command('export-gradebooks')
+    @click.option('--format', 'fmt', type=click.Choice(sorted(FORMATS)), default='csv', show_default=True)
+    def export_gradebooks(fmt):
+        """Export every course's gradebook under EXPORT_DIR, in the foreground."""
+        if fmt == 'parquet' and not parquet_available():
+            raise click.ClickException("Parquet export needs pyarrow (requirements-export.txt)")
+        export_id = _create_export(fmt)['id']
+        run_institution_export(current_app._get_current_object(), export_id, fmt)
+        status = read_export_status(export_id)
+        click.echo(f"{status['status']}: {status['courses_done']} courses in {os.path.abspath(_export_dir(export_id))}")
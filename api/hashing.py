@@ -0,0 +1,92 @@
+# Password hashing runs on a dedicated process pool, so a burst of logins
+# keeps PASSWORD_HASH_WORKERS cores busy instead of stalling every request
+# thread on CPU-bound key stretching. At most PASSWORD_HASH_MAX_PENDING hashes
+# may be queued or running per process; beyond that callers get an immediate
+# 503 rather than waiting in an ever-growing queue.
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import generate_password_hash, check_password_hash
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_slots = None
+_method_prefixes = {}
+
+
+def _executor():
+    global _pool, _pool_pid, _slots
+    # Re-create after fork: a pool inherited from the parent is unusable.
+    if _pool is None or _pool_pid != os.getpid():
+        with _lock:
+            if _pool is None or _pool_pid != os.getpid():
+                config = current_app.config
+                _pool = ProcessPoolExecutor(
+                    max_workers=config['PASSWORD_HASH_WORKERS'],
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+                _slots = threading.BoundedSemaphore(config['PASSWORD_HASH_MAX_PENDING'])
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _run(fn, *args):
+    if current_app.config['PASSWORD_HASH_WORKERS'] <= 0:
+        return fn(*args)
+
+    pool = _executor()
+    if not _slots.acquire(blocking=False):
+        raise ServiceUnavailable("Authentication is busy, please retry shortly", retry_after=1)
+    try:
+        future = pool.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+    except TimeoutError:
+        raise ServiceUnavailable("Authentication is busy, please retry shortly", retry_after=1)
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def verify_password(pwhash, password):
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """
+    True when `pwhash` was made with parameters other than the configured
+    PASSWORD_HASH_METHOD, e.g. before the work factor was raised.
+    """
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    if method not in _method_prefixes:
+        # werkzeug expands defaults ("scrypt" -> "scrypt:32768:8:1"); learn the
+        # full form once from a throwaway hash.
+        _method_prefixes[method] = generate_password_hash('', method).split('$', 1)[0]
+    return pwhash.split('$', 1)[0] != _method_prefixes[method]
+
+
+def warm_up():
+    """
+    Start the hashing pool's worker processes now rather than on the first
+    login after a deploy.
+    """
+    workers = current_app.config['PASSWORD_HASH_WORKERS']
+    if workers <= 0:
+        return
+    pool = _executor()
+    for future in [pool.submit(_noop) for _ in range(workers)]:
+        future.result()
+
+
+def _noop():
+    return None
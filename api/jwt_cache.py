@@ -0,0 +1,182 @@
+# Serving a cached token means doing for get_jwt() and friends what
+# verify_jwt_in_request() does, which Flask-JWT-Extended only exposes through
+# private names (_load_user, g._jwt_extended_*). requirements.txt pins the
+# version this was written against, and register_jwt_cache() checks at
+# startup that the installed one still behaves the same; if it doesn't, the
+# cache is switched off and every request is verified the regular way.
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, current_app, g
+from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_header, create_access_token
+from flask_jwt_extended.config import config as jwt_config
+from flask_jwt_extended.exceptions import RevokedTokenError
+from flask_jwt_extended.view_decorators import _load_user
+
+from api.revocation import token_revoked
+
+# WSGI environ key under which api/batch.py hands sub-requests the batch's
+# already verified (jwt_header, jwt_data). Clients cannot set environ keys
+# without an HTTP_ prefix, so this cannot be forged from outside.
+VERIFIED_JWT_ENVIRON_KEY = 'api.verified_jwt'
+
+
+class ClaimsCache:
+    """
+    Bounded LRU of verified JWTs keyed by the SHA-256 of the encoded token.
+    An entry is only served until the token's own `exp`, so caching never
+    extends a token's lifetime.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, expires_at, jwt_header, jwt_data):
+        with self._lock:
+            self._entries[key] = (expires_at, jwt_header, jwt_data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def token_digest(encoded_token):
+    return hashlib.sha256(encoded_token.encode()).digest()
+
+
+def _cache():
+    cache = current_app.extensions.get('jwt_claims_cache')
+    if cache is None:
+        cache = current_app.extensions['jwt_claims_cache'] = ClaimsCache(
+            current_app.config['JWT_CLAIMS_CACHE_SIZE']
+        )
+    return cache
+
+
+def _bearer_token():
+    header = request.headers.get(jwt_config.header_name, '')
+    prefix = f"{jwt_config.header_type} " if jwt_config.header_type else ''
+    if 'headers' not in jwt_config.token_location or not header.startswith(prefix):
+        return None
+    return header[len(prefix):] or None
+
+
+def forget_token():
+    """
+    Drop the current request's token from the claims cache, e.g. on logout.
+    """
+    encoded_token = _bearer_token()
+    if encoded_token is not None:
+        _cache().discard(token_digest(encoded_token))
+
+
+def verify_jwt_cached():
+    """
+    Drop-in for verify_jwt_in_request() on access-token views. A token whose
+    signature was already verified is served from the claims cache; the
+    revocation check still runs on every request (once per batch for
+    POST /batch sub-requests).
+    """
+    if request.method in jwt_config.exempt_methods:
+        return
+    if not current_app.extensions.get('jwt_context_supported'):
+        verify_jwt_in_request()
+        return
+
+    verified = request.environ.get(VERIFIED_JWT_ENVIRON_KEY)
+    if verified is not None:
+        # Sub-request of a batch: checked once for the whole batch.
+        _set_current_jwt(*verified)
+        return
+
+    encoded_token = _bearer_token()
+    if encoded_token is None or current_app.config['JWT_CLAIMS_CACHE_SIZE'] <= 0:
+        verify_jwt_in_request()
+        return
+
+    key = token_digest(encoded_token)
+    cache = _cache()
+    entry = cache.get(key)
+    if entry is None:
+        verify_jwt_in_request()
+        jwt_data = get_jwt()
+        cache.put(key, jwt_data.get('exp'), get_jwt_header(), jwt_data)
+        return
+
+    _, jwt_header, jwt_data = entry
+    if token_revoked(jwt_header, jwt_data):
+        raise RevokedTokenError(jwt_header, jwt_data)
+    _set_current_jwt(jwt_header, jwt_data)
+
+
+def _set_current_jwt(jwt_header, jwt_data):
+    # What verify_jwt_in_request() leaves behind for get_jwt() and friends.
+    g._jwt_extended_jwt_user = _load_user(jwt_header, jwt_data)
+    g._jwt_extended_jwt_header = jwt_header
+    g._jwt_extended_jwt = jwt_data
+    g._jwt_extended_jwt_location = 'headers'
+
+
+def _context_matches(app):
+    """
+    Whether _set_current_jwt() leaves exactly what verify_jwt_in_request()
+    does in the installed Flask-JWT-Extended.
+    """
+    with app.test_request_context():
+        token = create_access_token(identity='jwt-cache-self-check')
+        headers = {jwt_config.header_name: f"{jwt_config.header_type} {token}".strip()}
+    with app.test_request_context(headers=headers):
+        jwt_header, jwt_data = verify_jwt_in_request(skip_revocation_check=True)
+        expected = {name: value for name, value in vars(g).items() if name.startswith('_jwt_extended_')}
+    with app.test_request_context():
+        _set_current_jwt(jwt_header, jwt_data)
+        actual = {name: value for name, value in vars(g).items() if name.startswith('_jwt_extended_')}
+    return bool(expected) and actual == expected
+
+
+def register_jwt_cache(app):
+    try:
+        supported = _context_matches(app)
+    except Exception:
+        app.logger.exception("JWT claims cache self-check failed")
+        supported = False
+    if not supported:
+        app.logger.error("The installed Flask-JWT-Extended does not match api.jwt_cache; "
+                         "verifying every request without the claims cache")
+    app.extensions['jwt_context_supported'] = supported
+
+
+def cached_jwt_required():
+    """
+    Like flask_jwt_extended.jwt_required(), backed by the claims cache.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            verify_jwt_cached()
+            return current_app.ensure_sync(fn)(*args, **kwargs)
+        return decorator
+    return wrapper
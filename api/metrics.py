@@ -0,0 +1,251 @@
+# Per-endpoint request metrics exposed at /metrics in Prometheus text format.
+#
+# Every worker thread records into its own _ThreadStats, so the request hot
+# path only touches thread-local dicts and ints: no locks, no shared counters.
+# A scrape walks all threads' stats and sums them. Once a thread has exited
+# its stats are folded into one process-wide total and dropped, so servers
+# that start a thread per request don't grow the registry (or scrape time)
+# with every request served. Counts are per process; run one scrape target
+# per worker process when serving with a pre-fork server.
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import Response, request, g
+from sqlalchemy import event
+
+from api import db
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (thread, stats) of every thread that has recorded something and may still
+# be running; stats of exited threads are folded into _retired.
+_registry = []
+_registry_lock = threading.Lock()
+_prune_at = 64
+_local = threading.local()
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'sum', 'count')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.buckets[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.sum += other.sum
+        self.count += other.count
+
+
+class _ThreadStats:
+    def __init__(self):
+        self.requests = defaultdict(int)
+        self.latency = defaultdict(_Histogram)
+        self.db_time = defaultdict(_Histogram)
+        self.counters = defaultdict(int)
+        self.histograms = defaultdict(_Histogram)
+        self.in_flight = 0
+        self.request_db_time = 0.0
+        self.statement_started = 0.0
+
+    def merge(self, other):
+        # Everything but the in-flight gauge, which only live threads carry.
+        for attribute in ('requests', 'counters'):
+            totals = getattr(self, attribute)
+            for key, count in list(getattr(other, attribute).items()):
+                totals[key] += count
+        for attribute in ('latency', 'db_time', 'histograms'):
+            totals = getattr(self, attribute)
+            for key, histogram in list(getattr(other, attribute).items()):
+                totals[key].merge(histogram)
+
+
+_retired = _ThreadStats()
+
+
+def _prune():
+    # Fold the stats of exited threads into _retired. Called with
+    # _registry_lock held; an exited thread can no longer write its stats.
+    global _prune_at
+    live = []
+    for thread, stats in _registry:
+        if thread.is_alive():
+            live.append((thread, stats))
+        else:
+            _retired.merge(stats)
+    _registry[:] = live
+    _prune_at = max(64, 2 * len(live))
+
+
+def _stats():
+    stats = getattr(_local, 'stats', None)
+    if stats is None:
+        # Only the first request on each thread takes the lock.
+        stats = _local.stats = _ThreadStats()
+        with _registry_lock:
+            _registry.append((threading.current_thread(), stats))
+            if len(_registry) >= _prune_at:
+                _prune()
+    return stats
+
+
+def _collect():
+    """Process-wide totals of every thread's stats, past and present."""
+    total = _ThreadStats()
+    with _registry_lock:
+        _prune()
+        total.merge(_retired)
+        for _, stats in _registry:
+            total.merge(stats)
+            total.in_flight += stats.in_flight
+    return total
+
+
+# Application counters and histograms: name -> help text, declared once with
+# define_counter() / define_histogram().
+_counter_help = {}
+_histogram_help = {}
+
+
+def define_counter(name, help_text):
+    _counter_help[name] = help_text
+
+
+def define_histogram(name, help_text):
+    _histogram_help[name] = help_text
+
+
+def increment(name, **labels):
+    """
+    Bump an application counter declared with define_counter(). Thread-local,
+    like the request metrics.
+    """
+    _stats().counters[(name, tuple(sorted(labels.items())))] += 1
+
+
+def observe(name, value, **labels):
+    """
+    Record `value` (seconds) in an application histogram declared with
+    define_histogram(). Uses the request latency buckets.
+    """
+    _stats().histograms[(name, tuple(sorted(labels.items())))].observe(value)
+
+
+def _before_cursor_execute(*args):
+    _stats().statement_started = time.perf_counter()
+
+
+def _after_cursor_execute(*args):
+    stats = _stats()
+    stats.request_db_time += time.perf_counter() - stats.statement_started
+
+
+def _before_request():
+    stats = _stats()
+    stats.in_flight += 1
+    stats.request_db_time = 0.0
+    g.metrics_in_flight = True
+    g.metrics_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        stats = _stats()
+        endpoint = request.endpoint or 'unmatched'
+        stats.requests[(endpoint, request.method, response.status_code)] += 1
+        stats.latency[endpoint].observe(time.perf_counter() - started)
+        stats.db_time[endpoint].observe(stats.request_db_time)
+    return response
+
+
+def _teardown_request(exc):
+    if g.pop('metrics_in_flight', False):
+        _stats().in_flight -= 1
+
+
+def _label(**labels):
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+
+def _render_histogram(lines, name, help_text, histograms):
+    # `histograms` maps a tuple of (label, value) pairs to a histogram.
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in sorted(histograms.items()):
+        labels = dict(labels)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), histogram.buckets):
+            cumulative += count
+            lines.append(f"{name}_bucket{_label(**labels, le=bound)} {cumulative}")
+        suffix = _label(**labels) if labels else ''
+        lines.append(f"{name}_sum{suffix} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {histogram.count}")
+
+
+def _by_endpoint(histograms):
+    return {(('endpoint', endpoint),): histogram for endpoint, histogram in histograms.items()}
+
+
+# Extra collectors: callables returning lines of exposition text.
+collectors = []
+
+
+def render_metrics():
+    total = _collect()
+
+    lines = [
+        "# HELP http_requests_total Requests handled, by endpoint, method and status.",
+        "# TYPE http_requests_total counter",
+    ]
+    for (endpoint, method, status), count in sorted(total.requests.items()):
+        lines.append(f"http_requests_total{_label(endpoint=endpoint, method=method, status=status)} {count}")
+    lines += [
+        "# HELP http_requests_in_flight Requests currently being handled.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {total.in_flight}",
+    ]
+    _render_histogram(lines, 'http_request_duration_seconds',
+                      "Time spent handling a request, by endpoint.", _by_endpoint(total.latency))
+    _render_histogram(lines, 'http_request_db_seconds',
+                      "Time spent in database statements per request, by endpoint.",
+                      _by_endpoint(total.db_time))
+    for name, help_text in sorted(_counter_help.items()):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (counter, labels), count in sorted(total.counters.items()):
+            if counter == name:
+                lines.append(f"{name}{_label(**dict(labels)) if labels else ''} {count}")
+
+    for name, help_text in sorted(_histogram_help.items()):
+        _render_histogram(lines, name, help_text,
+                          {labels: histogram for (histogram_name, labels), histogram in total.histograms.items()
+                           if histogram_name == name})
+
+    for collector in collectors:
+        lines.extend(collector())
+    return '\n'.join(lines) + '\n'
+
+
+def register_metrics(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+    with app.app_context():
+        if not event.contains(db.engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
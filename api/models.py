@@ -1,5 +1,5 @@
 from api import db  # Ensure this is imported from your __init__.py
-from werkzeug.security import generate_password_hash, check_password_hash
+from api.hashing import hash_password, verify_password, needs_rehash
 
 
 class User(db.Model):
@@ -12,14 +12,20 @@ class User(db.Model):
     role = db.Column(db.String(20), nullable=False)  # 'student' or 'instructor'
 
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return verify_password(self.password, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password)
 
 
 class Course(db.Model):
     __tablename__ = 'courses'
+    __table_args__ = (
+        db.Index('ix_courses_instructor_id', 'instructor_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
@@ -29,6 +35,12 @@ class Course(db.Model):
 
 class Enrollment(db.Model):
     __tablename__ = 'enrollments'
+    __table_args__ = (
+        # A student is enrolled in a course at most once; also serves
+        # filter_by(student_id=...) lookups.
+        db.Index('uq_enrollments_student_id_course_id', 'student_id', 'course_id', unique=True),
+        db.Index('ix_enrollments_course_id', 'course_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
@@ -39,6 +51,9 @@ class Enrollment(db.Model):
 
 class Assignment(db.Model):
     __tablename__ = 'assignments'
+    __table_args__ = (
+        db.Index('ix_assignments_course_id_id', 'course_id', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
@@ -49,10 +64,49 @@ class Assignment(db.Model):
 
 class Grade(db.Model):
     __tablename__ = 'grades'
+    __table_args__ = (
+        # One grade per student per assignment; also serves the
+        # student history join on (student_id, assignment_id).
+        db.Index('uq_grades_student_id_assignment_id', 'student_id', 'assignment_id', unique=True),
+        db.Index('ix_grades_assignment_id_id', 'assignment_id', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.id'), nullable=False)
     student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     grade = db.Column(db.Float, nullable=False)
     graded_date = db.Column(db.Date, default=db.func.current_date())
     assignment = db.relationship('Assignment', backref='grades', lazy=True)
-    student = db.relationship('User', backref='grades', lazy=True)
\ No newline at end of file
+    student = db.relationship('User', backref='grades', lazy=True)
+
+class StudentCourseSummary(db.Model):
+    # Per-(student, course) rollup behind /student/history, maintained
+    # incrementally by api.summary whenever enrollments or grades are written.
+    __tablename__ = 'student_course_summary'
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), primary_key=True)
+    enrolled_date = db.Column(db.Date)
+    grade_count = db.Column(db.Integer, nullable=False, default=0)
+    grade_sum = db.Column(db.Float, nullable=False, default=0)
+    latest_grade = db.Column(db.Float)
+    latest_graded_date = db.Column(db.Date)
+    latest_grade_id = db.Column(db.Integer)
+
+
+class ResourceVersion(db.Model):
+    # Write counters per table behind ETags, maintained by api.versions.
+    __tablename__ = 'resource_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class RevokedToken(db.Model):
+    # Revoked access tokens by jti; mirrored in memory by api.revocation.
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = (
+        db.Index('ix_revoked_tokens_expires_at', 'expires_at'),
+        db.Index('ix_revoked_tokens_revoked_at', 'revoked_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,72 @@
+import base64
+import json
+
+from flask import request, current_app
+from werkzeug.exceptions import BadRequest
+
+
+def encode_cursor(value):
+    """
+    Turn the last primary key of a page into an opaque cursor string.
+    """
+    raw = json.dumps({"id": value}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor):
+    """
+    Reverse of encode_cursor. Returns None when no cursor was supplied.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()))["id"]
+    except (ValueError, TypeError, KeyError):
+        raise BadRequest("Invalid pagination cursor")
+    if not isinstance(value, int):
+        raise BadRequest("Invalid pagination cursor")
+    return value
+
+
+def parse_page_limit(raw, config):
+    """
+    Turn a raw ?limit= value into a page size, clamped to the server-side
+    maximum. A missing or non-numeric value means the default.
+    """
+    try:
+        limit = int(raw) if raw is not None else config['PAGINATION_DEFAULT_LIMIT']
+    except ValueError:
+        limit = config['PAGINATION_DEFAULT_LIMIT']
+    if limit < 1:
+        raise BadRequest("limit must be a positive integer")
+    return min(limit, config['PAGINATION_MAX_LIMIT'])
+
+
+def get_page_limit():
+    """
+    Read ?limit= from the request, clamped to the server-side maximum.
+    """
+    return parse_page_limit(request.args.get('limit'), current_app.config)
+
+
+def paginate(query, key_column):
+    """
+    Keyset pagination over `key_column` (the primary key).
+
+    Reads ?limit= and ?after= from the request and returns (rows, next_cursor).
+    Pages are always fetched as `WHERE key > :after ORDER BY key LIMIT n + 1`,
+    so no page ever costs an OFFSET scan; the extra row only tells us whether
+    another page exists.
+    """
+    limit = get_page_limit()
+    after = decode_cursor(request.args.get('after'))
+    if after is not None:
+        query = query.filter(key_column > after)
+    rows = query.order_by(key_column).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], key_column.key))
+    return rows, next_cursor
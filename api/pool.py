@@ -0,0 +1,77 @@
+# Database connection pool settings and pool metrics.
+#
+# engine_options() turns the DB_POOL_* settings into SQLALCHEMY_ENGINE_OPTIONS.
+# The pool is a QueuePool subclass that times every checkout, so /metrics
+# shows how long requests wait for a connection next to the pool's size,
+# checked-out and overflow gauges. Waits near DB_POOL_TIMEOUT, or any
+# timeouts, mean the pool is too small for the worker threads sharing it;
+# workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) must also stay under the
+# database's max_connections.
+import time
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+from api import db
+from api.metrics import define_counter, define_histogram, increment, observe, collectors
+
+define_histogram('db_pool_wait_seconds', "Time spent waiting to check a connection out of the pool.")
+define_counter('db_pool_timeouts_total', "Checkouts that gave up after DB_POOL_TIMEOUT.")
+
+
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            increment('db_pool_timeouts_total')
+            raise
+        finally:
+            observe('db_pool_wait_seconds', time.perf_counter() - started)
+
+
+def engine_options(config):
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if not uri:
+        return {}
+    url = make_url(uri)
+    options = {
+        "pool_pre_ping": config['DB_POOL_PRE_PING'],
+        "pool_recycle": config['DB_POOL_RECYCLE'],
+    }
+    # In-memory SQLite lives in a single connection; leave its pool alone.
+    if url.get_backend_name() != 'sqlite' or url.database not in (None, '', ':memory:'):
+        options.update({
+            "poolclass": TimedQueuePool,
+            "pool_size": config['DB_POOL_SIZE'],
+            "max_overflow": config['DB_MAX_OVERFLOW'],
+            "pool_timeout": config['DB_POOL_TIMEOUT'],
+        })
+    if url.get_backend_name() == 'postgresql' and config['DB_STATEMENT_TIMEOUT_MS'] > 0:
+        # Default for every statement on every connection.
+        options["connect_args"] = {"options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
+
+
+def _pool_metrics():
+    pool = db.engine.pool
+    if not isinstance(pool, QueuePool):
+        return []
+    return [
+        "# HELP db_pool_size Connections the pool keeps open.",
+        "# TYPE db_pool_size gauge",
+        f"db_pool_size {pool.size()}",
+        "# HELP db_pool_checked_out Connections currently checked out.",
+        "# TYPE db_pool_checked_out gauge",
+        f"db_pool_checked_out {pool.checkedout()}",
+        "# HELP db_pool_overflow Connections open beyond the pool size (negative while the pool is filling).",
+        "# TYPE db_pool_overflow gauge",
+        f"db_pool_overflow {pool.overflow()}",
+    ]
+
+
+def register_pool_metrics(app):
+    if _pool_metrics not in collectors:
+        collectors.append(_pool_metrics)
@@ -0,0 +1,140 @@
+# Opt-in SQL profiler: groups every statement a request runs by fingerprint
+# (the statement with literals, placeholders and IN-lists normalised away),
+# records count and time per fingerprint per request, and flags requests where
+# one fingerprint repeats more than SQL_PROFILER_N_PLUS_ONE_THRESHOLD times -
+# the signature of a lazy relationship loaded once per row.
+#
+# Enable with SQL_PROFILER_ENABLED=1. The aggregate report is served at
+# /debug/sql-profile and, with SQL_PROFILER_DUMP_AT_EXIT=1, printed when the
+# process exits (e.g. at the end of a test run).
+import atexit
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, request, current_app
+from sqlalchemy import event
+
+from api import db
+
+_COMMENTS = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDERS = re.compile(r'%\([^)]+\)s|%s|:\w+|\$\d+|\?')
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS = re.compile(r'(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+')
+_POSTCOMPILE = re.compile(r'\(?__\[POSTCOMPILE_\w+\]\)?')
+_WHITESPACE = re.compile(r'\s+')
+
+_local = threading.local()
+_lock = threading.Lock()
+_totals = defaultdict(lambda: {"count": 0, "seconds": 0.0, "requests": 0, "max_per_request": 0})
+_flagged = defaultdict(int)
+
+
+def fingerprint(statement):
+    """
+    Normalise a SQL statement so that executions differing only in literal
+    values, IN-list lengths or multi-row VALUES counts share one fingerprint.
+    """
+    text = _COMMENTS.sub(' ', statement)
+    text = _STRINGS.sub('?', text)
+    text = _POSTCOMPILE.sub('(...)', text)
+    text = _PLACEHOLDERS.sub('?', text)
+    text = _NUMBERS.sub('?', text)
+    text = _LISTS.sub('(...)', text)
+    text = _ROWS.sub(r'\1', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def _current():
+    return getattr(_local, 'statements', None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current() is not None:
+        _local.started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    statements = _current()
+    if statements is not None:
+        entry = statements[fingerprint(statement)]
+        entry[0] += 1
+        entry[1] += time.perf_counter() - _local.started
+
+
+def _before_request():
+    _local.statements = defaultdict(lambda: [0, 0.0])
+
+
+def _teardown_request(exc):
+    statements = _current()
+    _local.statements = None
+    if not statements:
+        return
+
+    threshold = current_app.config['SQL_PROFILER_N_PLUS_ONE_THRESHOLD']
+    endpoint = request.endpoint or 'unmatched'
+    repeated = [(fp, count) for fp, (count, _) in statements.items() if count > threshold]
+    with _lock:
+        for fp, (count, seconds) in statements.items():
+            total = _totals[fp]
+            total["count"] += count
+            total["seconds"] += seconds
+            total["requests"] += 1
+            total["max_per_request"] = max(total["max_per_request"], count)
+        if repeated:
+            _flagged[endpoint] += 1
+
+    for fp, count in repeated:
+        current_app.logger.warning(f"Possible N+1 in {endpoint}: {count} executions of: {fp}")
+
+
+def report(top=20):
+    """
+    Plain-text report of the `top` fingerprints by cumulative time, followed
+    by the endpoints that were flagged as N+1.
+    """
+    with _lock:
+        rows = sorted(_totals.items(), key=lambda item: item[1]["seconds"], reverse=True)[:top]
+        flagged = sorted(_flagged.items(), key=lambda item: item[1], reverse=True)
+
+    lines = [f"{'total ms':>10} {'count':>8} {'requests':>8} {'max/req':>8}  fingerprint"]
+    for fp, total in rows:
+        lines.append(f"{total['seconds'] * 1000:>10.2f} {total['count']:>8} {total['requests']:>8} "
+                     f"{total['max_per_request']:>8}  {fp}")
+    lines.append("")
+    lines.append("Requests flagged as N+1, by endpoint:")
+    lines.extend(f"  {endpoint}: {count}" for endpoint, count in flagged)
+    if not flagged:
+        lines.append("  none")
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    with _lock:
+        _totals.clear()
+        _flagged.clear()
+
+
+def register_profiler(app):
+    if not app.config['SQL_PROFILER_ENABLED']:
+        return
+
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
+    with app.app_context():
+        if not event.contains(db.engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+    if app.config['SQL_PROFILER_DUMP_AT_EXIT']:
+        atexit.register(lambda: sys.stderr.write(report(app.config['SQL_PROFILER_TOP'])))
+
+    @app.route('/debug/sql-profile', methods=['GET'])
+    def sql_profile():
+        top = request.args.get('top', app.config['SQL_PROFILER_TOP'], type=int)
+        return Response(report(top), mimetype='text/plain')
@@ -0,0 +1,163 @@
+# Access-token revocation keyed on the `jti` claim.
+#
+# Revocations are persisted to revoked_tokens and mirrored in every worker
+# process as a dict of jti -> expiry, so token_in_blocklist_loader is a set
+# lookup with no database round trip. A worker loads the unexpired rows once,
+# then a daemon thread polls for rows with an id above the last one it has
+# seen every REVOKED_TOKENS_SYNC_INTERVAL seconds. A token revoked on another
+# worker is therefore rejected here within one interval; one revoked on this
+# worker is rejected immediately. Entries are dropped once the token would
+# have expired anyway, so memory is bounded by revocations per token lifetime.
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import select, or_
+
+from api import db, jwt
+from api.bulk import insert_ignoring_conflicts
+from api.models import RevokedToken
+
+# Ids are assigned at insert but become visible at commit, so a poll can see
+# id N before a concurrent transaction holding id N-1 commits. Each poll also
+# re-reads rows revoked (revoked_at, stamped just before the commit) within
+# this many seconds before the previous poll started, which catches those
+# stragglers and modest clock skew between workers; merging is idempotent.
+SYNC_LOOKBACK_SECONDS = 10
+# Expired entries are swept from memory at most this often (seconds).
+PRUNE_INTERVAL = 60
+
+_lock = threading.Lock()
+_revoked = {}
+_last_id = 0
+_last_sync = None
+_loaded_pid = None
+_next_prune = 0.0
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _merge(rows):
+    global _last_id
+    now = time.time()
+    for row_id, jti, expires_at in rows:
+        _last_id = max(_last_id, row_id)
+        expires = expires_at.replace(tzinfo=timezone.utc).timestamp()
+        if expires > now:
+            _revoked[jti] = expires
+
+
+def _prune():
+    global _next_prune
+    now = time.time()
+    if now < _next_prune:
+        return
+    _next_prune = now + PRUNE_INTERVAL
+    for jti in [jti for jti, expires in _revoked.items() if expires <= now]:
+        _revoked.pop(jti, None)
+
+
+def sync():
+    """
+    Pull revocations made by other workers since the last sync.
+    """
+    global _last_sync
+    started = _utcnow()
+    since = (_last_sync or started) - timedelta(seconds=SYNC_LOOKBACK_SECONDS)
+    rows = db.session.execute(
+        select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+        .where(or_(RevokedToken.id > _last_id, RevokedToken.revoked_at > since))
+        .order_by(RevokedToken.id)
+    ).all()
+    with _lock:
+        _merge(rows)
+        _prune()
+        _last_sync = started
+
+
+def _poll(app, interval):
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                sync()
+            except Exception:
+                app.logger.exception("Revoked token sync failed")
+            finally:
+                db.session.remove()
+
+
+def ensure_loaded(app):
+    global _loaded_pid, _last_id, _last_sync
+    # Load once per process: a forked worker starts its own poller, since
+    # threads don't survive fork.
+    if _loaded_pid == os.getpid():
+        return
+    with _lock:
+        if _loaded_pid == os.getpid():
+            return
+        _revoked.clear()
+        _last_id = 0
+        _last_sync = _utcnow()
+        rows = db.session.execute(
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.expires_at > _utcnow())
+        ).all()
+        _merge(rows)
+        _last_id = db.session.execute(select(db.func.max(RevokedToken.id))).scalar() or 0
+        _loaded_pid = os.getpid()
+
+    interval = app.config['REVOKED_TOKENS_SYNC_INTERVAL']
+    if interval > 0:
+        threading.Thread(target=_poll, args=(app, interval), name='revoked-token-sync', daemon=True).start()
+
+
+def is_revoked(jti):
+    return jti in _revoked
+
+
+def revoke(jwt_data):
+    """
+    Revoke the token whose decoded claims are `jwt_data` in the database and
+    in this worker's set. Revoking the same token twice is a no-op.
+    """
+    expires_at = datetime.fromtimestamp(jwt_data['exp'], timezone.utc).replace(tzinfo=None)
+    insert_ignoring_conflicts(
+        RevokedToken.__table__,
+        [{"jti": jwt_data['jti'], "expires_at": expires_at, "revoked_at": _utcnow()}],
+    )
+    db.session.commit()
+    with _lock:
+        _revoked[jwt_data['jti']] = jwt_data['exp']
+
+
+def prune_expired():
+    """
+    Delete revocations of tokens that have expired on their own. Returns the
+    number of rows removed.
+    """
+    deleted = RevokedToken.query.filter(RevokedToken.expires_at <= _utcnow()).delete()
+    db.session.commit()
+    return deleted
+
+
+def token_revoked(jwt_header, jwt_payload):
+    """
+    The token_in_blocklist_loader check, also run directly on tokens served
+    from the claims cache (api.jwt_cache).
+    """
+    ensure_loaded(current_app._get_current_object())
+    return is_revoked(jwt_payload['jti'])
+
+
+def register_revocation(app):
+    jwt.token_in_blocklist_loader(token_revoked)
+
+    @app.cli.command('prune-revoked-tokens')
+    def prune_revoked_tokens():
+        """Delete revoked tokens that have expired."""
+        print(f"Deleted {prune_expired()} expired revoked tokens")
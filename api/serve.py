@@ -0,0 +1,137 @@
+# Production entry point: `flask --app app serve`.
+#
+# Runs the app under gunicorn's pre-fork server. The app is created once in
+# the master (preload) so workers fork with the code already imported, then
+# each worker:
+#   - drops the connection pool it inherited, without closing the parent's
+#     sockets, so no two processes ever share a database connection;
+#   - warms up before it accepts traffic: opens its pool connections, loads
+#     the revoked-token set, starts the password-hashing processes and issues
+#     SERVE_WARMUP_PATHS once to prime SQLAlchemy's statement cache and the
+#     response cache.
+# SIGTERM (or SIGINT) stops accepting connections and lets in-flight requests
+# finish for up to SERVE_GRACEFUL_TIMEOUT seconds before workers are killed.
+import threading
+import time
+
+import click
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from api import db
+from api.cache import LocalCache
+
+
+def _post_fork(app):
+    def post_fork(server, worker):
+        with app.app_context():
+            # close=False: the parent's connections stay open for the parent;
+            # this process just forgets them and opens its own.
+            db.engine.dispose(close=False)
+    return post_fork
+
+
+def _warm_pool(app, connections):
+    with app.app_context():
+        pool = db.engine.pool
+        # Never ask for more than the pool keeps open (SQLite pools have no size).
+        connections = min(connections, pool.size()) if isinstance(pool, QueuePool) else 1
+
+    def check():
+        with app.app_context():
+            with db.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+                try:
+                    barrier.wait(timeout=10)
+                except threading.BrokenBarrierError:
+                    pass
+
+    # Hold all connections at once so the pool really opens `connections`.
+    barrier = threading.Barrier(connections)
+    threads = [threading.Thread(target=check) for _ in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def warm_up(app, connections):
+    from api.hashing import warm_up as warm_up_hashing
+    from api.revocation import ensure_loaded
+
+    _warm_pool(app, connections)
+    with app.app_context():
+        ensure_loaded(app)
+        warm_up_hashing()
+        token = create_access_token(identity='0', additional_claims={"role": "warmup"})
+
+    client = app.test_client()
+    for path in app.config['SERVE_WARMUP_PATHS']:
+        response = client.get(path, headers={"Authorization": f"Bearer {token}"})
+        if response.status_code >= 500:
+            app.logger.warning(f"Warm-up request {path} failed with {response.status_code}")
+
+
+def _post_worker_init(app, connections):
+    # Runs in the worker after the app is loaded and before it starts
+    # accepting connections.
+    def post_worker_init(worker):
+        started = time.perf_counter()
+        warm_up(app, connections)
+        worker.log.info(f"Worker {worker.pid} warmed up in {time.perf_counter() - started:.2f}s")
+    return post_worker_init
+
+
+def _worker_exit(app):
+    def worker_exit(server, worker):
+        with app.app_context():
+            db.engine.dispose()
+    return worker_exit
+
+
+def serve(app, bind, workers, threads, graceful_timeout, timeout):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            settings = {
+                "bind": bind,
+                "workers": workers,
+                "threads": threads,
+                "worker_class": 'gthread' if threads > 1 else 'sync',
+                "preload_app": True,
+                "graceful_timeout": graceful_timeout,
+                "timeout": timeout,
+                "accesslog": '-',
+                "post_fork": _post_fork(app),
+                "post_worker_init": _post_worker_init(app, threads),
+                "worker_exit": _worker_exit(app),
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    Server().run()
+
+
+def register_serve(app):
+    config = app.config
+
+    @app.cli.command('serve')
+    @click.option('--bind', default=config['SERVE_BIND'], show_default=True)
+    @click.option('--workers', default=config['SERVE_WORKERS'], show_default=True, type=int)
+    @click.option('--threads', default=config['SERVE_THREADS'], show_default=True, type=int)
+    @click.option('--graceful-timeout', default=config['SERVE_GRACEFUL_TIMEOUT'], show_default=True, type=int)
+    @click.option('--timeout', default=config['SERVE_TIMEOUT'], show_default=True, type=int)
+    def serve_command(bind, workers, threads, graceful_timeout, timeout):
+        """Serve the app with pre-forked gunicorn workers."""
+        if workers > 1 and isinstance(app.extensions['response_cache'], LocalCache):
+            # Each worker would invalidate only its own copy on writes.
+            raise click.UsageError(
+                "CACHE_BACKEND=local caches per process and cannot be invalidated across "
+                f"{workers} workers; set CACHE_BACKEND=redis (or none), or serve with --workers 1"
+            )
+        serve(app, bind, workers, threads, graceful_timeout, timeout)
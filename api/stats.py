@@ -0,0 +1,125 @@
+from sqlalchemy import select, func, case
+
+from api.models import db, Assignment, Grade
+from api.cache import invalidate
+
+PERCENTILES = (10, 25, 75, 90)
+# Grades are bucketed over [0, 100] in steps of HISTOGRAM_WIDTH; anything
+# outside that range lands in the first or last bucket.
+HISTOGRAM_WIDTH = 10
+HISTOGRAM_BUCKETS = 100 // HISTOGRAM_WIDTH
+
+
+def _aggregates(ranked):
+    """
+    Aggregate columns over a subquery of (grade, rn, n), where rn is the
+    grade's 1-based rank within its group and n the number of grades in it.
+    Percentiles use the nearest-rank method; the median averages the middle
+    two ranks. Plain aggregates and CASE only, so it runs on SQLite too.
+    """
+    grade, rn, n = ranked.c.grade, ranked.c.rn, ranked.c.n
+    columns = [
+        func.count(grade).label('count'),
+        func.avg(grade).label('mean'),
+        func.min(grade).label('min'),
+        func.max(grade).label('max'),
+        func.sum(grade * grade).label('sum_squares'),
+        func.avg(case(((rn == (n + 1) // 2) | (rn == (n + 2) // 2), grade))).label('median'),
+    ]
+    columns += [
+        func.max(case((rn == (n * percentile + 99) // 100, grade))).label(f'p{percentile}')
+        for percentile in PERCENTILES
+    ]
+    for bucket in range(HISTOGRAM_BUCKETS):
+        low, high = bucket * HISTOGRAM_WIDTH, (bucket + 1) * HISTOGRAM_WIDTH
+        if bucket == 0:
+            condition = grade < high
+        elif bucket == HISTOGRAM_BUCKETS - 1:
+            condition = grade >= low
+        else:
+            condition = (grade >= low) & (grade < high)
+        columns.append(func.sum(case((condition, 1), else_=0)).label(f'bucket_{bucket}'))
+    return columns
+
+
+def _to_dict(row):
+    count = row.count
+    stddev = None
+    if count:
+        # Population standard deviation from the sum of squares.
+        stddev = max(row.sum_squares / count - row.mean * row.mean, 0.0) ** 0.5
+    return {
+        "count": count,
+        "mean": row.mean,
+        "median": row.median,
+        "stddev": stddev,
+        "min": row.min,
+        "max": row.max,
+        "percentiles": {f"p{p}": getattr(row, f'p{p}') for p in PERCENTILES},
+        "histogram": [{
+            "min": bucket * HISTOGRAM_WIDTH,
+            "max": (bucket + 1) * HISTOGRAM_WIDTH,
+            "count": getattr(row, f'bucket_{bucket}') or 0
+        } for bucket in range(HISTOGRAM_BUCKETS)]
+    }
+
+
+def course_grade_stats(course_id):
+    """
+    Grade statistics for a course and each of its assignments, in two
+    queries: one grouped by assignment, one over the whole course.
+    """
+    per_assignment = select(
+        Assignment.id.label('assignment_id'),
+        Assignment.title,
+        Grade.grade,
+        func.row_number().over(partition_by=Assignment.id, order_by=Grade.grade).label('rn'),
+        func.count(Grade.grade).over(partition_by=Assignment.id).label('n'),
+    ).outerjoin(
+        Grade, Grade.assignment_id == Assignment.id
+    ).where(
+        Assignment.course_id == course_id
+    ).subquery()
+    assignments = db.session.execute(
+        select(per_assignment.c.assignment_id, per_assignment.c.title, *_aggregates(per_assignment))
+        .group_by(per_assignment.c.assignment_id, per_assignment.c.title)
+        .order_by(per_assignment.c.assignment_id)
+    ).all()
+
+    whole_course = select(
+        Grade.grade,
+        func.row_number().over(order_by=Grade.grade).label('rn'),
+        func.count(Grade.grade).over().label('n'),
+    ).join(
+        Assignment, Assignment.id == Grade.assignment_id
+    ).where(
+        Assignment.course_id == course_id
+    ).subquery()
+    course = db.session.execute(select(*_aggregates(whole_course))).one()
+
+    return {
+        "course_id": course_id,
+        "course": _to_dict(course),
+        "assignments": [
+            {"assignment_id": row.assignment_id, "title": row.title, **_to_dict(row)}
+            for row in assignments
+        ]
+    }
+
+
+def stats_namespace(course_id):
+    return f"course-stats:{course_id}"
+
+
+def invalidate_course_stats(assignment_ids):
+    """
+    Drop cached stats of the courses the given assignments belong to. Call
+    after grades for those assignments were committed.
+    """
+    if not assignment_ids:
+        return
+    course_ids = db.session.execute(
+        select(Assignment.course_id).where(Assignment.id.in_(set(assignment_ids))).distinct()
+    ).scalars()
+    for course_id in course_ids:
+        invalidate(stats_namespace(course_id))
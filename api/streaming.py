@@ -0,0 +1,71 @@
+from flask import Response, request, current_app, stream_with_context
+
+from api.serialize import MSGPACK_MIMETYPE, negotiate, packb
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_stream():
+    """
+    True when the client asked for a streamed listing, either with
+    `Accept: application/x-ndjson` or with `?stream=1`.
+    """
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return _wants_ndjson()
+
+
+def _wants_ndjson():
+    best = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def stream_query(query, key_column, serialize):
+    """
+    Stream every row of `query` (ordered by `key_column`) to the client.
+
+    Rows are read through `yield_per`, which makes SQLAlchemy use a
+    server-side cursor where the driver supports one, and are written out one
+    batch at a time. Memory use therefore stays at one batch of rows and one
+    batch of encoded output, however large the table is.
+
+    The body is NDJSON when the client accepts `application/x-ndjson`, a
+    sequence of MessagePack maps (one per row, read with msgpack.Unpacker)
+    when it prefers `application/msgpack`, and a JSON array otherwise.
+    """
+    batch_size = current_app.config['STREAM_BATCH_SIZE']
+    rows = query.order_by(key_column).yield_per(batch_size)
+    if _wants_ndjson():
+        mimetype = NDJSON_MIMETYPE
+    else:
+        mimetype = negotiate(request.accept_mimetypes)
+    encode = packb if mimetype == MSGPACK_MIMETYPE else current_app.json.dumps
+
+    def batches():
+        chunk = []
+        for row in rows:
+            chunk.append(encode(serialize(row)))
+            if len(chunk) >= batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    if mimetype == NDJSON_MIMETYPE:
+        def generate():
+            for chunk in batches():
+                yield '\n'.join(chunk) + '\n'
+    elif mimetype == MSGPACK_MIMETYPE:
+        def generate():
+            for chunk in batches():
+                yield b''.join(chunk)
+    else:
+        def generate():
+            yield '['
+            separator = ''
+            for chunk in batches():
+                yield separator + ','.join(chunk)
+                separator = ','
+            yield ']'
+
+    return Response(stream_with_context(generate()), mimetype=mimetype)
@@ -0,0 +1,130 @@
+from sqlalchemy import select, insert, update, delete, func, and_, or_, case, tuple_
+
+from api.models import db, Enrollment, Assignment, Grade, StudentCourseSummary
+
+_SUMMARY_COLUMNS = [
+    'student_id', 'course_id', 'enrolled_date', 'grade_count', 'grade_sum',
+    'latest_grade', 'latest_graded_date', 'latest_grade_id',
+]
+
+
+def is_enrolled(student_id, assignment_id):
+    """
+    Whether the student is enrolled in the assignment's course. Summary rows
+    exist only for enrollments, so grades are only accepted for these.
+    """
+    return db.session.query(
+        db.session.query(Enrollment.id).join(
+            Assignment, Assignment.course_id == Enrollment.course_id
+        ).filter(
+            Assignment.id == assignment_id,
+            Enrollment.student_id == student_id
+        ).exists()
+    ).scalar()
+
+
+def _rollup(*criteria):
+    """
+    Per-(student, course) count and sum of the grades matching `criteria`,
+    and the most recent of them: latest graded_date, then highest id.
+    """
+    group = (Grade.student_id, Assignment.course_id)
+    ranked = select(
+        Grade.id,
+        Grade.student_id,
+        Assignment.course_id,
+        Grade.grade,
+        Grade.graded_date,
+        func.count(Grade.id).over(partition_by=group).label('grade_count'),
+        func.sum(Grade.grade).over(partition_by=group).label('grade_sum'),
+        func.row_number().over(
+            partition_by=group, order_by=(Grade.graded_date.desc(), Grade.id.desc())
+        ).label('position'),
+    ).join(
+        Assignment, Assignment.id == Grade.assignment_id
+    ).where(*criteria).subquery()
+    return select(
+        ranked.c.student_id,
+        ranked.c.course_id,
+        ranked.c.grade_count,
+        ranked.c.grade_sum,
+        ranked.c.grade.label('latest_grade'),
+        ranked.c.graded_date.label('latest_graded_date'),
+        ranked.c.id.label('latest_grade_id'),
+    ).where(ranked.c.position == 1).subquery()
+
+
+def record_enrollments(enrollment_ids):
+    """
+    Create summary rows for freshly flushed enrollments.
+    Runs in the caller's transaction; the caller commits.
+    """
+    if not enrollment_ids:
+        return
+    rows = select(
+        Enrollment.student_id,
+        Enrollment.course_id,
+        Enrollment.enrolled_date,
+        db.literal(0),
+        db.literal(0.0),
+        db.null(),
+        db.null(),
+        db.null(),
+    ).where(Enrollment.id.in_(enrollment_ids))
+    db.session.execute(insert(StudentCourseSummary).from_select(_SUMMARY_COLUMNS, rows))
+
+
+def record_grades(grade_ids):
+    """
+    Fold freshly flushed grades into their (student, course) summary rows
+    with a single UPDATE ... FROM, so a batch of grades costs one statement.
+    Runs in the caller's transaction; the caller commits.
+    """
+    if not grade_ids:
+        return
+    changes = _rollup(Grade.id.in_(grade_ids))
+    summary = StudentCourseSummary
+    # Compared against the row as the UPDATE finds it, so of two concurrent
+    # writers the one with the older grade leaves latest_* alone.
+    newer = or_(
+        summary.latest_grade_id.is_(None),
+        tuple_(changes.c.latest_graded_date, changes.c.latest_grade_id)
+        > tuple_(summary.latest_graded_date, summary.latest_grade_id),
+    )
+
+    db.session.execute(
+        update(summary).where(
+            summary.student_id == changes.c.student_id,
+            summary.course_id == changes.c.course_id,
+        ).values(
+            grade_count=summary.grade_count + changes.c.grade_count,
+            grade_sum=summary.grade_sum + changes.c.grade_sum,
+            latest_grade=case((newer, changes.c.latest_grade), else_=summary.latest_grade),
+            latest_graded_date=case((newer, changes.c.latest_graded_date), else_=summary.latest_graded_date),
+            latest_grade_id=case((newer, changes.c.latest_grade_id), else_=summary.latest_grade_id),
+        )
+    )
+
+
+def rebuild_summaries():
+    """
+    Recompute every summary row from enrollments and grades. Used after bulk
+    loads that bypass the controllers (seeding) and to repair drift.
+    """
+    graded = _rollup()
+    rows = select(
+        Enrollment.student_id,
+        Enrollment.course_id,
+        Enrollment.enrolled_date,
+        func.coalesce(graded.c.grade_count, 0),
+        func.coalesce(graded.c.grade_sum, 0.0),
+        graded.c.latest_grade,
+        graded.c.latest_graded_date,
+        graded.c.latest_grade_id,
+    ).outerjoin(
+        graded, and_(graded.c.student_id == Enrollment.student_id,
+                     graded.c.course_id == Enrollment.course_id)
+    )
+
+    db.session.execute(delete(StudentCourseSummary))
+    db.session.execute(insert(StudentCourseSummary).from_select(_SUMMARY_COLUMNS, rows))
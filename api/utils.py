@@ -1,15 +1,33 @@
+import random
+from datetime import date
+from functools import wraps
 from flask import jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt
+from flask_jwt_extended import get_jwt
+from api.jwt_cache import cached_jwt_required
+from api.metrics import define_counter, increment
+
+define_counter('auth_role_checks_total', "role_required checks, by token role and outcome.")
 
 def role_required(required_role):
     def wrapper(fn):
-        @jwt_required()
+        @wraps(fn)
+        @cached_jwt_required()  # Verified claims are cached per token until exp
         def decorated_function(*args, **kwargs):
             claims = get_jwt()  # Get all claims from the JWT
             role = claims.get('role')  # Extract the 'role' claim
-            current_app.logger.info(f"User role: {role}")  # Log the role
-            if role != required_role:
+            allowed = role == required_role
+            increment('auth_role_checks_total', role=role, outcome='allowed' if allowed else 'forbidden')
+            if random.random() < current_app.config['ROLE_LOG_SAMPLE_RATE']:
+                current_app.logger.debug(f"User role: {role}")  # Sampled, not per request
+            if not allowed:
                 return jsonify({"message": "Access forbidden: insufficient permissions"}), 403
             return fn(*args, **kwargs)
         return decorated_function
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def parse_date(value):
+    """A "YYYY-MM-DD" string as a date, or None if it isn't one."""
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,166 @@
+# Per-resource version counters for conditional GETs.
+#
+# resource_versions holds write counters for the tracked tables. Tables whose
+# rows belong to a student (enrollments, grades) are counted per student
+# ("grades:student_id=42"), so one student's writes neither queue behind
+# another's on a shared counter row nor change anyone else's ETags. Writes
+# whose rows can't be told apart (UPDATE/DELETE by criteria, INSERT ...
+# SELECT) bump the table-wide counter ("grades") instead. Any session that
+# writes a tracked table - through the unit of work or a Core/ORM bulk
+# statement - bumps each affected counter once per transaction, inside the
+# same transaction, so a counter changes exactly when the rows it covers may
+# have changed.
+#
+# @versioned(*resources) derives a strong ETag from those counters, the caller
+# and the query string. A request whose If-None-Match matches gets a 304 after
+# a single primary-key read of resource_versions: the view, the main tables and
+# serialisation are skipped. The counters are read before the view runs, so a
+# write landing mid-request can only make the ETag older than the body, which
+# costs the client one extra full response, never a missed change.
+import hashlib
+from functools import wraps
+
+from flask import request, current_app
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session
+
+from api import db
+from api.bulk import insert_ignoring_conflicts
+from api.models import ResourceVersion
+
+# Table name -> column its counters are kept per value of, or None for a
+# single counter per table.
+TRACKED_TABLES = {
+    'courses': None,
+    'enrollments': 'student_id',
+    'assignments': None,
+    'grades': 'student_id',
+}
+
+
+def counter_name(table_name, value=None):
+    """The counter of `table_name` rows whose scope column equals `value`; table-wide for None."""
+    if value is None:
+        return table_name
+    return f"{table_name}:{TRACKED_TABLES[table_name]}={value}"
+
+
+def _bump(session, names):
+    bumped = session.info.setdefault('bumped_resources', set())
+    names = sorted(set(names) - bumped)
+    if not names:
+        return
+    bumped.update(names)
+    connection = session.connection()
+    # New counters start at 1; existing ones (including any a concurrent
+    # transaction just created) are incremented.
+    created = set(insert_ignoring_conflicts(
+        ResourceVersion.__table__, [{"name": name, "version": 1} for name in names], connection
+    ))
+    existing = [name for name in names if name not in created]
+    if existing:
+        connection.execute(
+            update(ResourceVersion.__table__)
+            .where(ResourceVersion.name.in_(existing))
+            .values(version=ResourceVersion.version + 1)
+        )
+
+
+def _object_counters(obj, table_name):
+    column = TRACKED_TABLES[table_name]
+    if column is None:
+        return [counter_name(table_name)]
+    # The row's scope before and after the flush, should it have moved.
+    history = inspect(obj).attrs[column].history
+    values = {value for value in (*history.unchanged, *history.added, *history.deleted) if value is not None}
+    values.add(getattr(obj, column))
+    return [counter_name(table_name, value) for value in values if value is not None] or [counter_name(table_name)]
+
+
+def _after_flush(session, flush_context):
+    names = []
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is None or table.name not in TRACKED_TABLES:
+            continue
+        if obj in session.new or obj in session.deleted or session.is_modified(obj):
+            names.extend(_object_counters(obj, table.name))
+    _bump(session, names)
+
+
+def _statement_counters(orm_execute_state, table_name):
+    column = TRACKED_TABLES[table_name]
+    parameters = orm_execute_state.parameters
+    rows = parameters if isinstance(parameters, list) else [parameters] if parameters else []
+    if column is None or not orm_execute_state.is_insert or not rows:
+        return [counter_name(table_name)]
+    values = {row.get(column) for row in rows}
+    if None in values:
+        return [counter_name(table_name)]
+    return [counter_name(table_name, value) for value in values]
+
+
+def _do_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table_name = orm_execute_state.statement.table.name
+        if table_name in TRACKED_TABLES:
+            _bump(orm_execute_state.session, _statement_counters(orm_execute_state, table_name))
+
+
+def _reset(session):
+    session.info.pop('bumped_resources', None)
+
+
+def current_versions(names):
+    rows = db.session.execute(
+        db.select(ResourceVersion.name, ResourceVersion.version)
+        .where(ResourceVersion.name.in_(names))
+    ).all()
+    versions = dict(rows)
+    return [versions.get(name, 0) for name in names]
+
+
+def versioned(*resources):
+    """
+    Serve the view with a strong ETag built from the version counters of
+    `resources` (the tables its response is read from) and answer a matching
+    If-None-Match with 304 Not Modified. Tables counted per student are
+    taken to be read for the caller only. Must run after JWT verification.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorated_function(*args, **kwargs):
+            identity = get_jwt_identity()
+            names = []
+            for resource in resources:
+                names.append(counter_name(resource))
+                if TRACKED_TABLES[resource] is not None:
+                    names.append(counter_name(resource, identity))
+            versions = current_versions(names)
+            digest = hashlib.sha256(repr((
+                request.endpoint, identity, sorted(request.args.items(multi=True)),
+                request.accept_mimetypes.best_match(
+                    ['application/json', 'application/x-ndjson', 'application/msgpack'], default='application/json'
+                ),
+                versions,
+            )).encode()).hexdigest()[:32]
+
+            if request.if_none_match.contains(digest):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(digest)
+            return response
+        return decorated_function
+    return wrapper
+
+
+def register_versions(app):
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'do_orm_execute', _do_orm_execute)
+        event.listen(Session, 'after_commit', _reset)
+        event.listen(Session, 'after_rollback', _reset)
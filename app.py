@@ -4,4 +4,5 @@ from api import create_app
 app = create_app()
 
 if __name__ == '__main__':
+    # Development server; use `flask --app app serve` in production.
     app.run(debug=True, host="0.0.0.0", port=5005)
\ No newline at end of file
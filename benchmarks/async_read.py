@@ -0,0 +1,180 @@
+"""
+Requests/sec of the read endpoints on the sync (`flask serve`) and async
+(api/asgi.py under uvicorn) paths at high concurrency.
+
+    python -m benchmarks.async_read --connections 500 --duration 15
+    python -m benchmarks.async_read --database-url postgresql://... --workers 4
+
+Both servers are started as subprocesses with the same worker count against
+the same database, and each is driven by --connections concurrent keep-alive
+connections cycling through the five endpoints the async app serves. Without
+--database-url a throwaway SQLite file is seeded at --scale first. Needs the
+packages in requirements-async.txt.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+SCALES = {
+    'small': dict(students=200, courses=20, instructors=5),
+    'medium': dict(students=5000, courses=250, instructors=25),
+}
+
+PATHS = [
+    '/courses/list',
+    '/assignments/course/{course_id}',
+    '/enrollments/list',
+    '/users/{student_id}',
+    '/api/student/history',
+]
+
+
+def prepare(database_url, scale):
+    """
+    Seed a throwaway database when none was given; return the URL and one
+    (path, token) pair per seeded student to cycle through.
+    """
+    from flask_jwt_extended import create_access_token
+    from api import create_app, db
+    import seed
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url})
+    options = seed.parse_args([f"--{key}={value}" for key, value in SCALES[scale].items()])
+    with app.app_context():
+        if database_url.startswith('sqlite'):
+            db.drop_all()
+            db.create_all()
+    if database_url.startswith('sqlite'):
+        seed.seed_data(options, app)
+
+    requests = []
+    with app.app_context():
+        for index in range(min(options.students, 200)):
+            student_id = options.instructors + index + 1
+            token = create_access_token(identity=str(student_id), additional_claims={"role": "student"})
+            course_id = index % options.courses + 1
+            for path in PATHS:
+                requests.append((path.format(course_id=course_id, student_id=student_id), token))
+    return requests
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, port, args, env):
+    if kind == 'sync':
+        command = [sys.executable, '-m', 'flask', '--app', 'app', 'serve', '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(args.workers), '--threads', str(args.threads)]
+    else:
+        command = [sys.executable, '-m', 'uvicorn', '--factory', 'api.asgi:create_asgi_app', '--port', str(port),
+                   '--workers', str(args.workers), '--log-level', 'warning', '--no-access-log']
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            time.sleep(2)  # let every worker finish booting and warming up
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{kind} server did not start")
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _connection(port, requests, offset, deadline, latencies, statuses):
+    reader = writer = None
+    index = offset
+    while time.perf_counter() < deadline:
+        path, token = requests[index % len(requests)]
+        index += 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: Bearer {token}\r\n\r\n".encode())
+            status = await _read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            statuses['error'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, requests, connections, duration):
+    latencies, statuses = [], Counter()
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(
+        _connection(port, requests, number * 7, deadline, latencies, statuses)
+        for number in range(connections)
+    ))
+    return latencies, statuses
+
+
+def summarise(kind, latencies, statuses, duration):
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000 if ordered else float('nan')
+    print(f"{kind:<6} {len(ordered) / duration:>10.1f} req/s   p50 {pick(0.5):>8.1f}ms   p99 {pick(0.99):>8.1f}ms   "
+          f"mean {statistics.fmean(ordered) * 1000 if ordered else float('nan'):>8.1f}ms   "
+          f"statuses {dict(sorted(statuses.items(), key=str))}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the sync and async read paths under high concurrency.")
+    parser.add_argument('--database-url', help="already-seeded database (default: throwaway SQLite)")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--connections', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8, help="threads per sync worker")
+    parser.add_argument('--only', choices=('sync', 'async'), help="run just one of the two paths")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='async-read-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    requests = prepare(database_url, args.scale)
+    env = dict(os.environ, DATABASE_URL=database_url, PASSWORD_HASH_WORKERS='0')
+
+    print(f"{args.connections} connections for {args.duration:.0f}s, {args.workers} workers per server")
+    for kind in ('sync', 'async'):
+        if args.only and kind != args.only:
+            continue
+        port = _free_port()
+        process = start_server(kind, port, args, env)
+        try:
+            latencies, statuses = asyncio.run(load(port, requests, args.connections, args.duration))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+        summarise(kind, latencies, statuses, args.duration)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,362 @@
+"""
+Per-endpoint microbenchmarks against a local, freshly seeded database.
+
+    python -m benchmarks.endpoints --scales small,medium
+    python -m benchmarks.endpoints --scales small --compare benchmarks/results/<old>.json
+
+For every endpoint registered by api.controllers.register_blueprints and for
+every dataset scale, the app is driven through Flask's test client and the
+run records p50/p95/p99 latency, SQL statements per request and peak Python
+memory per request. Results are written as JSON (one file per commit by
+default) so two runs can be compared.
+
+The database is dropped and re-created for each scale. By default a throwaway
+SQLite file is used; pass --database-url to point at a disposable PostgreSQL.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timezone
+
+from sqlalchemy import event
+
+SCALES = {
+    'small': dict(students=200, courses=20, instructors=5),
+    'medium': dict(students=5000, courses=250, instructors=25),
+    'large': dict(students=50000, courses=2000, instructors=200),
+}
+
+# endpoint -> (method, path, role, json body). Strings are formatted with the
+# ids of seeded rows and with {i}, the iteration number, so writes that must
+# be unique (registration, course names) stay unique. The 'fresh_student'
+# role gets a new student token for every call, for endpoints that use their
+# token up (logout revokes it). Writes that can only succeed once per row use
+# the {fresh_*} FIXTURES instead of seeded ids. Every call must answer 2xx or
+# 304; other statuses are reported and fail the run.
+ENDPOINTS = {
+    'auth.register': ('POST', '/auth/register', None,
+                      {"name": "Bench User", "email": "bench{i}@example.edu", "phone": "555",
+                       "password": "password123", "role": "student"}),
+    'auth.login': ('POST', '/auth/login', None,
+                   {"email": "{student_email}", "password": "password123"}),
+    'auth.logout': ('POST', '/auth/logout', 'fresh_student', None),
+    'user.get_all_user': ('GET', '/users/', 'instructor', None),
+    'user.get_user_by_id': ('GET', '/users/{student_id}', 'student', None),
+    'user.update_user': ('PUT', '/users/{student_id}', 'student', {"phone": "555{i}"}),
+    'user.delete_user': ('DELETE', '/users/{fresh_user_id}', 'instructor', None),
+    'course.test_token': ('GET', '/courses/test-token', 'student', None),
+    'course.create_course': ('POST', '/courses/create', 'instructor',
+                             {"name": "Bench course {i}", "description": "Benchmark"}),
+    'course.get_all_courses': ('GET', '/courses/list', 'student', None),
+    'course.get_course_stats': ('GET', '/courses/{course_id}/stats', 'instructor', None),
+    'course.get_course_gradebook': ('GET', '/courses/{course_id}/gradebook.csv', 'instructor', None),
+    'course.update_course': ('PUT', '/courses/update/{course_id}', 'instructor',
+                             {"description": "Updated {i}"}),
+    'enrollment.create_enroll': ('POST', '/enrollments/enroll', 'student', {"course_id": "{fresh_course_id}"}),
+    'enrollment.create_bulk_enroll': ('POST', '/enrollments/bulk', 'instructor',
+                                      {"course_id": "{fresh_course_id}", "students": "{student_ids}"}),
+    'enrollment.get_student_enrollments': ('GET', '/enrollments/list', 'student', None),
+    'assignment.create_assignment': ('POST', '/assignments/create', 'instructor',
+                                     {"title": "Bench {i}", "description": "Benchmark",
+                                      "due_date": "2030-01-01", "course_id": "{course_id}"}),
+    'assignment.get_assignment': ('GET', '/assignments/course/{course_id}', 'student', None),
+    'grade.create_assign': ('POST', '/grades/assign', 'instructor',
+                            {"assignment_id": "{fresh_assignment_id}", "student_id": "{student_id}", "grade": 90}),
+    'grade.create_bulk': ('POST', '/grades/bulk', 'instructor', "{fresh_grade_rows}"),
+    'grade.get_assignment_grades': ('GET', '/grades/assignment/{assignment_id}', 'instructor', None),
+    'routes.student_history': ('GET', '/api/student/history', 'student', None),
+    'routes.instructor_dashboard': ('GET', '/api/instructor/dashboard', 'instructor', None),
+    # routes.create_gradebook_export is left out: it starts a
+    # whole-institution export in the background.
+    'routes.get_gradebook_export': ('GET', '/api/exports/gradebooks/{export_id}', 'instructor', None),
+    'routes.download_gradebook_export': ('GET', '/api/exports/gradebooks/{export_id}/course-{course_id}.csv',
+                                         'instructor', None),
+    'batch': ('POST', '/batch', 'student',
+              {"requests": [{"path": "/users/{student_id}"}, {"path": "/assignments/course/{course_id}"},
+                            {"path": "/enrollments/list"}]}),
+    'metrics': ('GET', '/metrics', None, None),
+}
+
+
+
+def _fresh_user_id(app, params):
+    from api.models import db, User
+    with app.app_context():
+        user = User(name="Bench fixture", email=f"fixture{params['i']}-{time.monotonic_ns()}@example.edu",
+                    password='x', role='student')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def _fresh_course_id(app, params):
+    from api.models import db, Course
+    with app.app_context():
+        course = Course(name=f"Bench fixture {params['i']}", description="Benchmark",
+                        instructor_id=params['instructor_id'])
+        db.session.add(course)
+        db.session.commit()
+        return course.id
+
+
+def _fresh_assignment_id(app, params):
+    from api.models import db, Assignment
+    with app.app_context():
+        assignment = Assignment(title=f"Bench fixture {params['i']}", description="Benchmark",
+                                due_date=date(2030, 1, 1), course_id=params['course_id'])
+        db.session.add(assignment)
+        db.session.commit()
+        return assignment.id
+
+
+def _fresh_grade_rows(app, params):
+    assignment_id = _fresh_assignment_id(app, params)
+    return [{"assignment_id": assignment_id, "student_id": student_id, "grade": 75}
+            for student_id in params['enrolled_ids']]
+
+
+# {fresh_*} parameters, made before every call (outside the timed section)
+# for writes that need rows of their own: a user to delete, a course nobody
+# is enrolled in yet, an assignment of the benchmark course with no grades.
+FIXTURES = {
+    'fresh_user_id': _fresh_user_id,
+    'fresh_course_id': _fresh_course_id,
+    'fresh_assignment_id': _fresh_assignment_id,
+    'fresh_grade_rows': _fresh_grade_rows,
+}
+
+
+def _fill(value, params):
+    # "{name}" on its own is replaced by the raw parameter (int, list, ...).
+    if isinstance(value, str):
+        if value.startswith('{') and value.endswith('}') and value[1:-1] in params:
+            return params[value[1:-1]]
+        return value.format(**params)
+    if isinstance(value, dict):
+        return {k: _fill(v, params) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, params) for v in value]
+    return value
+
+
+def _percentile(samples, percent):
+    if len(samples) < 2:
+        return samples[0] if samples else None
+    return statistics.quantiles(samples, n=100, method='inclusive')[percent - 1]
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _build_app(database_url, scale, workdir):
+    from flask_jwt_extended import create_access_token
+    from api import create_app, db
+    import seed
+
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "EXPORT_DIR": os.path.join(workdir, 'exports'),
+    })
+    app.logger.disabled = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    options = seed.parse_args([f"--{key}={value}" for key, value in SCALES[scale].items()])
+    seed.seed_data(options, app)
+
+    with app.app_context():
+        from api.models import Course, Assignment, Enrollment
+        from api.gradebook import _create_export, run_institution_export
+        course = db.session.get(Course, 1)
+        assignment = Assignment.query.filter_by(course_id=course.id).first()
+        # Students enrolled in the benchmark course, so grading them succeeds.
+        enrolled_ids = db.session.execute(
+            db.select(Enrollment.student_id).filter_by(course_id=course.id)
+            .order_by(Enrollment.student_id).limit(100)
+        ).scalars().all()
+        student_id = enrolled_ids[0]
+
+        def student_token():
+            with app.app_context():
+                return create_access_token(identity=str(student_id), additional_claims={"role": "student"})
+
+        tokens = {
+            'student': student_token(),
+            'fresh_student': student_token,
+            'instructor': create_access_token(identity=str(course.instructor_id),
+                                              additional_claims={"role": "instructor"}),
+        }
+        params = {
+            "student_id": student_id,
+            "student_email": "student1@example.edu",
+            "course_id": course.id,
+            "assignment_id": assignment.id,
+            "instructor_id": course.instructor_id,
+            "student_ids": list(range(options.instructors + 1, options.instructors + 101)),
+            "enrolled_ids": enrolled_ids,
+            "export_id": _create_export('csv', course.instructor_id)['id'],
+        }
+        # Finished in the foreground so its course files can be downloaded.
+        run_institution_export(app, params['export_id'], 'csv')
+
+        statements = [0]
+
+        def count_statement(*args):
+            statements[0] += 1
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+    return app, tokens, params, statements
+
+
+def _succeeded(status_code):
+    return 200 <= status_code < 300 or status_code == 304
+
+
+def _run_endpoint(client, spec, tokens, params, iterations, statements):
+    method, path, role, body = spec
+    app = client.application
+    fixtures = [name for name in FIXTURES if '{' + name + '}' in repr(spec)]
+
+    def headers():
+        token = tokens[role] if role else None
+        if callable(token):
+            token = token()
+        return {"Authorization": f"Bearer {token}"} if token else {}
+
+    def values(i):
+        values = dict(params, i=i)
+        values.update((name, FIXTURES[name](app, values)) for name in fixtures)
+        return values
+
+    def call(values, headers):
+        response = client.open(_fill(path, values), method=method,
+                               json=_fill(body, values), headers=headers)
+        # Drain streamed bodies (gradebook exports) so they are timed too.
+        response.get_data()
+        response.close()
+        return response
+
+    latencies, status_codes = [], {}
+    for i in range(iterations):
+        call_values, call_headers = values(i), headers()
+        started = time.perf_counter()
+        response = call(call_values, call_headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+
+    # A separate traced call, so tracemalloc overhead stays out of the timings.
+    call_values, call_headers = values(iterations), headers()
+    statements[0] = 0
+    tracemalloc.start()
+    response = call(call_values, call_headers)
+    status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "sql_statements": statements[0],
+        "peak_memory_kb": round(peak / 1024, 1),
+        "status_codes": status_codes,
+        "failed_calls": sum(count for code, count in status_codes.items() if not _succeeded(code)),
+    }
+
+
+def run(scales, database_url, iterations, workdir):
+    results = {}
+    for scale in scales:
+        app, tokens, params, statements = _build_app(database_url, scale, workdir)
+        client = app.test_client()
+        registered = {rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint != 'static'}
+        for endpoint in sorted(registered - set(ENDPOINTS)):
+            print(f"warning: no benchmark spec for {endpoint}", file=sys.stderr)
+
+        results[scale] = {}
+        for endpoint in sorted(registered & set(ENDPOINTS)):
+            result = _run_endpoint(client, ENDPOINTS[endpoint], tokens, params, iterations, statements)
+            results[scale][endpoint] = result
+            flag = f"  FAILED {result['status_codes']}" if result['failed_calls'] else ''
+            print(f"{scale:>6} {endpoint:<40} p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+                  f"p99 {result['p99_ms']:>8.2f}ms  sql {result['sql_statements']:>3}  "
+                  f"mem {result['peak_memory_kb']:>9.1f}KB{flag}")
+    return results
+
+
+def compare(current, baseline, threshold):
+    regressions = 0
+    for scale, endpoints in current.items():
+        for endpoint, result in endpoints.items():
+            before = baseline.get(scale, {}).get(endpoint)
+            if not before:
+                continue
+            ratio = result['p95_ms'] / before['p95_ms'] if before['p95_ms'] else 1.0
+            flag = ''
+            if ratio > 1 + threshold or result['sql_statements'] > before['sql_statements']:
+                flag = '  REGRESSION'
+                regressions += 1
+            print(f"{scale:>6} {endpoint:<40} p95 {before['p95_ms']:>8.2f} -> {result['p95_ms']:>8.2f}ms "
+                  f"({ratio - 1:+.0%})  sql {before['sql_statements']} -> {result['sql_statements']}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-endpoint microbenchmarks.")
+    parser.add_argument('--scales', default='small',
+                        help=f"comma-separated subset of {', '.join(SCALES)}")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--database-url',
+                        help="disposable database to benchmark against; it is wiped for every scale")
+    parser.add_argument('--output', help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="p95 slowdown reported as a regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    scales = [scale.strip() for scale in args.scales.split(',')]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        commit = _git_commit()
+        results = run(scales, database_url, args.iterations, tmp)
+
+    output = args.output or os.path.join(os.path.dirname(__file__), 'results', f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            "commit": commit,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "iterations": args.iterations,
+            "results": results,
+        }, f, indent=2, sort_keys=True)
+    print(f"Results written to {output}")
+
+    failed = [f"{scale} {endpoint}" for scale, endpoints in results.items()
+              for endpoint, result in endpoints.items() if result['failed_calls']]
+    if failed:
+        print(f"error: non-2xx/304 responses from {', '.join(failed)}; their timings are not valid results",
+              file=sys.stderr)
+        return 1
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        return 1 if compare(results, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
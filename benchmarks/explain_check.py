@@ -0,0 +1,145 @@
+"""
+EXPLAIN every SELECT the hot endpoints issue and fail on sequential scans.
+
+Run against a seeded, production-sized PostgreSQL database:
+
+    DATABASE_URL=postgresql://... python -m benchmarks.explain_check
+
+The check drives the real endpoints through Flask's test client, captures
+the SQL they emit, and runs `EXPLAIN (FORMAT JSON)` on each statement with
+the parameters it was executed with. Planners happily seq-scan small tables,
+so it refuses to run when the dataset is below --min-rows.
+"""
+import argparse
+import sys
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, func
+
+from api import create_app, db
+from api.models import User, Course, Enrollment, Assignment, Grade
+from api.pagination import encode_cursor
+
+# (method, path template, role whose token is used, json body)
+HOT_ENDPOINTS = [
+    ('POST', '/auth/login', None, {"email": "{student_email}", "password": "-"}),
+    ('GET', '/users/', 'instructor', None),
+    ('GET', '/users/?after={user_cursor}', 'instructor', None),
+    ('GET', '/users/{student_id}', 'student', None),
+    ('GET', '/courses/list', 'student', None),
+    ('GET', '/courses/list?after={course_cursor}', 'student', None),
+    ('GET', '/enrollments/list', 'student', None),
+    ('GET', '/assignments/course/{course_id}', 'student', None),
+    ('GET', '/grades/assignment/{assignment_id}', 'instructor', None),
+    ('GET', '/api/student/history', 'student', None),
+]
+
+
+def _sample_params():
+    enrollment = Enrollment.query.order_by(Enrollment.id.desc()).first()
+    grade = Grade.query.order_by(Grade.id.desc()).first()
+    assignment = db.session.get(Assignment, grade.assignment_id)
+    course = db.session.get(Course, assignment.course_id)
+    student = db.session.get(User, enrollment.student_id)
+    middle_user = db.session.query(func.max(User.id)).scalar() // 2
+    middle_course = db.session.query(func.max(Course.id)).scalar() // 2
+    return {
+        "student_id": student.id,
+        "student_email": student.email,
+        "instructor_id": course.instructor_id,
+        "course_id": course.id,
+        "assignment_id": assignment.id,
+        "user_cursor": encode_cursor(middle_user),
+        "course_cursor": encode_cursor(middle_course),
+    }
+
+
+def _fill(value, params):
+    if isinstance(value, str):
+        return value.format(**params)
+    if isinstance(value, dict):
+        return {k: _fill(v, params) for k, v in value.items()}
+    return value
+
+
+def _seq_scans(plan):
+    scans = []
+    if plan.get('Node Type') == 'Seq Scan':
+        scans.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        scans.extend(_seq_scans(child))
+    return scans
+
+
+def _capture_statements(app, params):
+    statements = {}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.setdefault(statement, (request_label, parameters))
+
+    tokens = {
+        'student': create_access_token(identity=str(params['student_id']),
+                                       additional_claims={"role": "student"}),
+        'instructor': create_access_token(identity=str(params['instructor_id']),
+                                          additional_claims={"role": "instructor"}),
+    }
+    client = app.test_client()
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for method, path, role, body in HOT_ENDPOINTS:
+            request_label = f"{method} {_fill(path, params)}"
+            # Start each request with an empty identity map so get() hits SQL.
+            db.session.expunge_all()
+            headers = {"Authorization": f"Bearer {tokens[role]}"} if role else {}
+            response = client.open(_fill(path, params), method=method,
+                                   json=_fill(body, params), headers=headers)
+            if response.status_code >= 500:
+                raise RuntimeError(f"{request_label} failed with {response.status_code}")
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--min-rows', type=int, default=100000,
+                        help="minimum number of grades rows for the check to be meaningful")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print("explain_check needs a PostgreSQL DATABASE_URL", file=sys.stderr)
+            return 2
+
+        grade_rows = db.session.query(func.count(Grade.id)).scalar()
+        if grade_rows < args.min_rows:
+            print(f"Only {grade_rows} grades rows; seed at least {args.min_rows} first",
+                  file=sys.stderr)
+            return 2
+
+        db.session.execute(db.text('ANALYZE'))
+        params = _sample_params()
+        statements = _capture_statements(app, params)
+
+        failures = 0
+        connection = db.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            for statement, (label, parameters) in statements.items():
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+                plan = cursor.fetchone()[0][0]['Plan']
+                scans = _seq_scans(plan)
+                status = 'SEQ SCAN on ' + ', '.join(scans) if scans else 'ok'
+                print(f"[{status}] {label}\n    {' '.join(statement.split())}")
+                failures += bool(scans)
+        finally:
+            connection.close()
+
+    print(f"{len(statements)} statements checked, {failures} with sequential scans")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Measure the per-request cost of authorising a request with role_required.
+
+    python -m benchmarks.jwt_cache --tokens 50 --requests 20000
+
+"before" is the original decorator: jwt_required() (full decode and signature
+check on every call) plus an info-level role log line. "after" is the current
+role_required with the claims cache enabled, so each of --tokens distinct
+tokens is verified once and then served from the cache. A no-op view is
+called inside a test request context, so only the authorisation work is timed.
+"""
+import argparse
+import logging
+import statistics
+import sys
+import time
+from functools import wraps
+
+from flask import jsonify, current_app
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt
+
+from api import create_app
+from api.utils import role_required
+
+
+def legacy_role_required(required_role):
+    # role_required as it was before the claims cache.
+    def wrapper(fn):
+        @wraps(fn)
+        @jwt_required()
+        def decorated_function(*args, **kwargs):
+            role = get_jwt().get('role')
+            current_app.logger.info(f"User role: {role}")
+            if role != required_role:
+                return jsonify({"message": "Access forbidden: insufficient permissions"}), 403
+            return fn(*args, **kwargs)
+        return decorated_function
+    return wrapper
+
+
+def view():
+    return None
+
+
+def measure(app, decorated, tokens, requests):
+    timings = []
+    for number in range(requests):
+        headers = {"Authorization": f"Bearer {tokens[number % len(tokens)]}"}
+        with app.test_request_context('/', headers=headers):
+            started = time.perf_counter()
+            decorated()
+            timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return {
+        "mean_us": statistics.fmean(timings),
+        "p50_us": timings[len(timings) // 2],
+        "p99_us": timings[int(len(timings) * 0.99)],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time role_required with and without the claims cache.")
+    parser.add_argument('--tokens', type=int, default=50, help="distinct tokens to rotate through")
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    # The original app logged at INFO to app.log; keep the log write in the
+    # "before" measurement without spamming the terminal.
+    app.logger.handlers = [logging.NullHandler()]
+    app.logger.setLevel(logging.INFO)
+    app.logger.propagate = False
+    with app.app_context():
+        tokens = [create_access_token(identity=str(n), additional_claims={"role": "instructor"})
+                  for n in range(args.tokens)]
+
+    results = {
+        "before (jwt_required + info log)": measure(app, legacy_role_required('instructor')(view), tokens, args.requests),
+        "after (claims cache + sampled log)": measure(app, role_required('instructor')(view), tokens, args.requests),
+    }
+    for name, stats in results.items():
+        print(f"{name:<36} mean {stats['mean_us']:>8.1f}us  p50 {stats['p50_us']:>8.1f}us  "
+              f"p99 {stats['p99_us']:>8.1f}us")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Replay recorded traffic against a running app.
+
+    python -m benchmarks.replay app.log --target http://localhost:5005 --speed 60 --concurrency 32
+    python -m benchmarks.replay captures.jsonl --clones 100 --speed 10 --output replay.json
+
+Inputs are werkzeug access logs (the format of app.log) and/or JSONL request
+captures with one object per line:
+
+    {"timestamp": "2024-12-22T18:49:30", "client": "s-17", "method": "GET",
+     "path": "/api/student/history", "body": null}
+
+`timestamp` may also be epoch seconds; `client` and `body` are optional.
+
+Requests are grouped into per-client sessions, keeping each session's start
+offset and inter-arrival gaps. Every session is replayed as a seeded user
+(student<n>@example.edu / instructor<n>@example.edu from seed.py) holding a
+JWT minted with create_access_token, so the target must share this
+environment's JWT_SECRET_KEY. --clones multiplies the sessions, --speed
+compresses time, and --concurrency bounds the requests in flight.
+"""
+import argparse
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+ANSI = re.compile(r'\x1b\[[0-9;]*m')
+ACCESS_LINE = re.compile(
+    r'(?P<client>\S+) - - \[(?P<timestamp>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3})'
+)
+ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+# Paths only instructors may call; sessions touching them replay as instructors.
+INSTRUCTOR_PATHS = re.compile(
+    r'^/(users/?$|courses/(create|update)|assignments/create|grades/|enrollments/bulk|'
+    r'api/(users$|courses$|assignments$|grades$))'
+)
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+def parse_access_log(lines):
+    for line in lines:
+        match = ACCESS_LINE.search(ANSI.sub('', line))
+        if match:
+            yield {
+                "timestamp": datetime.strptime(match['timestamp'], '%d/%b/%Y %H:%M:%S').timestamp(),
+                "client": match['client'],
+                "method": match['method'],
+                "path": match['path'],
+                "body": None,
+            }
+
+
+def parse_jsonl(lines):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if 'method' not in record or 'path' not in record:
+            continue
+        timestamp = record.get('timestamp', 0)
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+        yield {
+            "timestamp": float(timestamp),
+            "client": str(record.get('client', 'jsonl')),
+            "method": record['method'].upper(),
+            "path": record['path'],
+            "body": record.get('body'),
+        }
+
+
+def load_requests(paths):
+    requests = []
+    for path in paths:
+        with open(path) as f:
+            parser = parse_jsonl if path.endswith('.jsonl') else parse_access_log
+            requests.extend(parser(f))
+    return sorted(requests, key=lambda request: request['timestamp'])
+
+
+def endpoint_of(method, path):
+    return f"{method} {ID_SEGMENT.sub('/<id>', path.split('?')[0])}"
+
+
+def build_profile(requests, idle_gap):
+    """
+    Split requests into sessions: consecutive requests of one client with no
+    pause longer than `idle_gap` seconds. Returns the sessions (start offset,
+    [(delay since previous request, request), ...]) and the endpoint mix.
+    """
+    if not requests:
+        return [], Counter()
+    origin = requests[0]['timestamp']
+    by_client = defaultdict(list)
+    for request in requests:
+        by_client[request['client']].append(request)
+
+    sessions = []
+    for client_requests in by_client.values():
+        current, previous = None, None
+        for request in client_requests:
+            if previous is None or request['timestamp'] - previous > idle_gap:
+                current = {"start": request['timestamp'] - origin, "steps": []}
+                sessions.append(current)
+                delay = 0.0
+            else:
+                delay = request['timestamp'] - previous
+            current['steps'].append((delay, request))
+            previous = request['timestamp']
+
+    mix = Counter(endpoint_of(request['method'], request['path']) for request in requests)
+    return sorted(sessions, key=lambda session: session['start']), mix
+
+
+def mint_tokens(sessions, clones, students, instructors):
+    from flask_jwt_extended import create_access_token
+    from api import create_app
+
+    app = create_app()
+    identities = []
+    with app.app_context():
+        for number in range(len(sessions) * clones):
+            session = sessions[number % len(sessions)]
+            is_instructor = any(INSTRUCTOR_PATHS.match(request['path']) for _, request in session['steps'])
+            if is_instructor:
+                index = number % instructors
+                user_id, role, email = index + 1, 'instructor', f"instructor{index + 1}@example.edu"
+            else:
+                index = number % students
+                user_id, role, email = instructors + index + 1, 'student', f"student{index + 1}@example.edu"
+            token = create_access_token(identity=str(user_id), additional_claims={"role": role})
+            identities.append({"token": token, "email": email})
+    return identities
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = Counter()
+        self.lag = []
+
+    def record(self, endpoint, status, latency_ms, lag_ms):
+        with self.lock:
+            self.latencies[endpoint].append(latency_ms)
+            self.statuses[status] += 1
+            self.lag.append(lag_ms)
+
+
+def send(target, request, identity, timeout):
+    body = request['body']
+    if body is None and request['path'].rstrip('/').endswith('/auth/login'):
+        body = {"email": identity['email'], "password": "password123"}
+    data = json.dumps(body).encode() if body is not None else None
+    http_request = urllib.request.Request(target + request['path'], data=data, method=request['method'])
+    http_request.add_header('Authorization', f"Bearer {identity['token']}")
+    if data is not None:
+        http_request.add_header('Content-Type', 'application/json')
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 'error'
+
+
+def replay(sessions, identities, target, speed, concurrency, clones, timeout):
+    recorder = Recorder()
+    span = max((session['start'] for session in sessions), default=0.0)
+    schedule = []
+    for number, identity in enumerate(identities):
+        session = sessions[number % len(sessions)]
+        # Clones are spread evenly across the original span so they don't all
+        # start at the same instant.
+        offset = session['start'] + (number // len(sessions)) * span / max(clones, 1)
+        at = offset
+        for delay, request in session['steps']:
+            at += delay
+            schedule.append((at / speed, request, identity))
+    schedule.sort(key=lambda item: item[0])
+
+    def run(due, request, identity, started):
+        begin = time.perf_counter()
+        status = send(target, request, identity, timeout)
+        end = time.perf_counter()
+        recorder.record(endpoint_of(request['method'], request['path']), status,
+                        (end - begin) * 1000, (begin - started - due) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for due, request, identity in schedule:
+            wait = started + due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            pool.submit(run, due, request, identity, started)
+    return recorder, time.perf_counter() - started
+
+
+def histogram(latencies):
+    counts = Counter()
+    for latency in latencies:
+        bucket = next((f"<={limit}ms" for limit in LATENCY_BUCKETS_MS if latency <= limit),
+                      f">{LATENCY_BUCKETS_MS[-1]}ms")
+        counts[bucket] += 1
+    labels = [f"<={limit}ms" for limit in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+    return [(label, counts[label]) for label in labels]
+
+
+def summarise(latencies):
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"count": len(ordered), "mean_ms": round(statistics.fmean(ordered), 2),
+            "p50_ms": round(pick(0.50), 2), "p95_ms": round(pick(0.95), 2), "p99_ms": round(pick(0.99), 2)}
+
+
+def report(recorder, elapsed, mix):
+    everything = [latency for values in recorder.latencies.values() for latency in values]
+    total = len(everything)
+    print("\nRecorded endpoint mix: " + ", ".join(f"{endpoint} x{count}" for endpoint, count in mix.most_common()))
+    print(f"Replayed {total} requests in {elapsed:.2f}s: {total / elapsed if elapsed else 0:.1f} req/s")
+    print("Status codes: " + ", ".join(f"{status}: {count}" for status, count in sorted(recorder.statuses.items(), key=str)))
+    if not total:
+        return {}
+
+    print("\nLatency histogram")
+    buckets = histogram(everything)
+    widest = max(count for _, count in buckets) or 1
+    for label, count in buckets:
+        print(f"  {label:>9} {count:>7} {'#' * int(40 * count / widest)}")
+
+    print("\nPer endpoint")
+    per_endpoint = {endpoint: summarise(values) for endpoint, values in recorder.latencies.items()}
+    for endpoint, stats in sorted(per_endpoint.items()):
+        print(f"  {endpoint:<40} n={stats['count']:<6} p50 {stats['p50_ms']:>8.2f}ms  "
+              f"p95 {stats['p95_ms']:>8.2f}ms  p99 {stats['p99_ms']:>8.2f}ms")
+    print(f"\nScheduling lag p95: {summarise(recorder.lag)['p95_ms']:.2f}ms "
+          "(high lag means --concurrency is the bottleneck, not the server)")
+
+    return {
+        "requests": total,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+        "status_codes": {str(status): count for status, count in recorder.statuses.items()},
+        "histogram": dict(buckets),
+        "overall": summarise(everything),
+        "endpoints": per_endpoint,
+        "mix": dict(mix),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded traffic against a running app.")
+    parser.add_argument('inputs', nargs='+', help="access logs and/or .jsonl captures")
+    parser.add_argument('--target', default='http://localhost:5005')
+    parser.add_argument('--speed', type=float, default=1.0, help="time compression factor (10 = 10x faster)")
+    parser.add_argument('--concurrency', type=int, default=16, help="maximum requests in flight")
+    parser.add_argument('--clones', type=int, default=1, help="replay every session this many times as different users")
+    parser.add_argument('--idle-gap', type=float, default=1800, help="seconds of silence that end a session")
+    parser.add_argument('--students', type=int, default=20, help="seeded students to spread sessions over")
+    parser.add_argument('--instructors', type=int, default=5, help="seeded instructors to spread sessions over")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--output', help="write the summary as JSON")
+    args = parser.parse_args(argv)
+
+    sessions, mix = build_profile(load_requests(args.inputs), args.idle_gap)
+    if not sessions:
+        print("No requests found in the inputs", file=sys.stderr)
+        return 2
+    print(f"{sum(len(s['steps']) for s in sessions)} requests in {len(sessions)} sessions; "
+          f"replaying x{args.clones} at {args.speed}x speed with concurrency {args.concurrency}")
+
+    identities = mint_tokens(sessions, args.clones, args.students, args.instructors)
+    recorder, elapsed = replay(sessions, identities, args.target.rstrip('/'), args.speed,
+                               args.concurrency, args.clones, args.timeout)
+    summary = report(recorder, elapsed, mix)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
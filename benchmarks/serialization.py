@@ -0,0 +1,152 @@
+"""
+Serialisation cost of large Grade and Enrollment payloads, old path versus
+api.serialize.
+
+    python -m benchmarks.serialization --rows 100000
+    python -m benchmarks.serialization --rows 100000 --repeat 7 --kinds grades
+
+A throwaway SQLite file is filled with --rows grades and --rows enrollments.
+Each payload is then built and encoded three ways:
+
+    orm+json      ORM instances, dicts built by hand with .isoformat() per
+                  date, Flask's default (stdlib) JSON provider - the path the
+                  list views used before api.serialize
+    rows+orjson   row_query() column tuples mapped straight to dicts,
+                  encoded by api.serialize.dumps (orjson)
+    rows+msgpack  the same rows encoded as MessagePack
+
+and the best of --repeat runs is reported for the query-and-build and the
+encode phases separately.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+KINDS = ('grades', 'enrollments')
+
+
+def prepare(rows):
+    workdir = tempfile.mkdtemp(prefix='serialization-')
+    from api import create_app, db
+    from api.models import User, Course, Enrollment, Assignment, Grade
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'bench.db')}"})
+    students = 1000
+    with app.app_context():
+        db.create_all()
+        db.session.execute(User.__table__.insert(), [
+            {"id": i, "name": f"Student {i}", "email": f"s{i}@example.edu", "password": 'x', "role": 'student'}
+            for i in range(1, students + 1)
+        ])
+        courses = rows // students + 1
+        db.session.execute(Course.__table__.insert(), [
+            {"id": i, "name": f"Course {i}", "description": "Benchmark", "instructor_id": 1}
+            for i in range(1, courses + 1)
+        ])
+        db.session.execute(Assignment.__table__.insert(), [
+            {"id": i, "title": f"Assignment {i}", "description": "Benchmark", "due_date": date(2025, 1, 1),
+             "course_id": i}
+            for i in range(1, courses + 1)
+        ])
+        start = date(2024, 1, 1)
+        db.session.execute(Enrollment.__table__.insert(), [
+            {"student_id": i % students + 1, "course_id": i // students + 1,
+             "enrolled_date": start + timedelta(days=i % 365)}
+            for i in range(rows)
+        ])
+        db.session.execute(Grade.__table__.insert(), [
+            {"student_id": i % students + 1, "assignment_id": i // students + 1, "grade": (i * 37) % 10000 / 100,
+             "graded_date": start + timedelta(days=i % 365)}
+            for i in range(rows)
+        ])
+        db.session.commit()
+    return app
+
+
+def _legacy_grade(grade):
+    return {
+        "id": grade.id,
+        "assignment_id": grade.assignment_id,
+        "student_id": grade.student_id,
+        "grade": grade.grade,
+        "graded_date": grade.graded_date.isoformat() if grade.graded_date else None
+    }
+
+
+def _legacy_enrollment(enrollment):
+    return {
+        "course_id": enrollment.course_id,
+        "enrolled_date": enrollment.enrolled_date.isoformat() if enrollment.enrolled_date else None
+    }
+
+
+def paths(kind):
+    from flask.json.provider import DefaultJSONProvider
+    from flask import current_app
+    from api.fields import GRADE_FIELDS, ENROLLMENT_FIELDS, row_query
+    from api.models import db, Grade, Enrollment
+    from api.serialize import dumps, packb
+
+    model, fields, legacy = {
+        'grades': (Grade, GRADE_FIELDS, _legacy_grade),
+        'enrollments': (Enrollment, ENROLLMENT_FIELDS, _legacy_enrollment),
+    }[kind]
+    stdlib = DefaultJSONProvider(current_app._get_current_object())
+
+    def orm_build():
+        return {"items": [legacy(obj) for obj in model.query.order_by(model.id)], "next_cursor": None}
+
+    def rows_build():
+        query, serialize = row_query(model, fields)
+        return {"items": [serialize(row) for row in query.order_by(model.id)], "next_cursor": None}
+
+    return [
+        ('orm+json', orm_build, lambda payload: stdlib.response(payload).get_data()),
+        ('rows+orjson', rows_build, dumps),
+        ('rows+msgpack', rows_build, packb),
+    ], db
+
+
+def measure(build, encode, repeat, db):
+    best_build = best_encode = float('inf')
+    size = 0
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        payload = build()
+        built = time.perf_counter()
+        body = encode(payload)
+        done = time.perf_counter()
+        best_build = min(best_build, built - started)
+        best_encode = min(best_encode, done - built)
+        size = len(body)
+    return best_build, best_encode, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare serialisation paths over large payloads.")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--kinds', default=','.join(KINDS), help="comma-separated subset of " + ', '.join(KINDS))
+    args = parser.parse_args(argv)
+
+    app = prepare(args.rows)
+    print(f"{args.rows} rows per payload, best of {args.repeat}")
+    with app.app_context():
+        for kind in args.kinds.split(','):
+            candidates, db = paths(kind)
+            baseline = None
+            for name, build, encode in candidates:
+                build_s, encode_s, size = measure(build, encode, args.repeat, db)
+                total = build_s + encode_s
+                baseline = baseline or total
+                print(f"{kind:<12} {name:<13} build {build_s * 1000:>8.1f}ms   encode {encode_s * 1000:>8.1f}ms   "
+                      f"total {total * 1000:>8.1f}ms   {baseline / total:>5.2f}x   {size / 1e6:>6.2f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
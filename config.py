@@ -8,11 +8,87 @@ load_dotenv()
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Async read path (api/asgi.py); defaults to DATABASE_URL with an async driver
+    ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL')
+
+    # Connection pool, per worker process (see api/pool.py). A statement
+    # timeout of 0 means none; PostgreSQL only.
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1').lower() in ('1', 'true', 'yes')
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))
     SECRET_KEY = os.getenv("SECRET_KEY", "default_secret")
-    DEBUG = True
+    DEBUG = os.getenv('DEBUG', '0').lower() in ('1', 'true', 'yes')
 
     # JWT configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 1)))
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(seconds=int(os.getenv('JWT_REFRESH_TOKEN_EXPIRES', 86400)))
-    JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
\ No newline at end of file
+    JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+
+    # Keyset pagination
+    PAGINATION_DEFAULT_LIMIT = int(os.getenv('PAGINATION_DEFAULT_LIMIT', 50))
+    PAGINATION_MAX_LIMIT = int(os.getenv('PAGINATION_MAX_LIMIT', 500))
+
+    # Streamed listings (?stream=1 / application/x-ndjson)
+    STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 1000))
+
+    # POST /batch: sub-requests per batch, batches in flight per process and
+    # the seconds after which a batch stops starting sub-requests
+    BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+    BATCH_MAX_CONCURRENT = int(os.getenv('BATCH_MAX_CONCURRENT', 2))
+    BATCH_TIMEOUT = float(os.getenv('BATCH_TIMEOUT', 10))
+
+    # Whole-institution gradebook exports are written under EXPORT_DIR by
+    # this many background threads per process; a running export refreshes
+    # its heartbeat this often (seconds) and is failed after missing three
+    EXPORT_DIR = os.getenv('EXPORT_DIR', 'exports')
+    EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', 1))
+    EXPORT_HEARTBEAT_INTERVAL = float(os.getenv('EXPORT_HEARTBEAT_INTERVAL', 10))
+
+    # Bulk imports are validated and committed this many rows at a time
+    BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 1000))
+
+    # Verified JWT claims cached per token (0 disables) and the share of
+    # role checks that are logged at debug level
+    JWT_CLAIMS_CACHE_SIZE = int(os.getenv('JWT_CLAIMS_CACHE_SIZE', 10000))
+    ROLE_LOG_SAMPLE_RATE = float(os.getenv('ROLE_LOG_SAMPLE_RATE', 0.01))
+
+    # Revoked tokens are checked in memory; other workers' revocations are
+    # picked up from the database this often (seconds, 0 disables polling)
+    REVOKED_TOKENS_SYNC_INTERVAL = float(os.getenv('REVOKED_TOKENS_SYNC_INTERVAL', 1))
+
+    # Response cache for catalog listings: "local" (per-process LRU of at
+    # most CACHE_MAX_BYTES; single-process only), "redis" (shared, at
+    # CACHE_URL), "none" or "module:Class"
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'local')
+    CACHE_URL = os.getenv('CACHE_URL', 'redis://localhost:6379/0')
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    CACHE_TTL = float(os.getenv('CACHE_TTL', 300))
+    CACHE_LOCK_TIMEOUT = float(os.getenv('CACHE_LOCK_TIMEOUT', 5))
+
+    # Password hashing: werkzeug method string (e.g. "scrypt:32768:8:1" or
+    # "pbkdf2:sha256:600000") and the process pool it runs on. 0 workers hashes
+    # inline in the request thread.
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 32))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))
+
+    # `flask serve`: pre-forked gunicorn workers x threads, warmed up with
+    # SERVE_WARMUP_PATHS (comma-separated) before they accept traffic
+    SERVE_BIND = os.getenv('SERVE_BIND', '0.0.0.0:5005')
+    SERVE_WORKERS = int(os.getenv('SERVE_WORKERS', os.cpu_count() or 1))
+    SERVE_THREADS = int(os.getenv('SERVE_THREADS', 4))
+    SERVE_GRACEFUL_TIMEOUT = int(os.getenv('SERVE_GRACEFUL_TIMEOUT', 30))
+    SERVE_TIMEOUT = int(os.getenv('SERVE_TIMEOUT', 60))
+    SERVE_WARMUP_PATHS = [path for path in os.getenv('SERVE_WARMUP_PATHS', '/courses/list').split(',') if path]
+
+    # Opt-in SQL fingerprint profiler with N+1 detection
+    SQL_PROFILER_ENABLED = os.getenv('SQL_PROFILER_ENABLED', '0').lower() in ('1', 'true', 'yes')
+    SQL_PROFILER_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_PROFILER_N_PLUS_ONE_THRESHOLD', 5))
+    SQL_PROFILER_TOP = int(os.getenv('SQL_PROFILER_TOP', 20))
+    SQL_PROFILER_DUMP_AT_EXIT = os.getenv('SQL_PROFILER_DUMP_AT_EXIT', '0').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,45 @@
+"""add foreign key indexes
+
+Revision ID: 3f9c2a7d1e54
+Revises: 511b6ebcf29f
+Create Date: 2026-10-18 09:12:41.402113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1e54'
+down_revision = '511b6ebcf29f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Drop duplicates the new unique indexes would reject: keep the first
+    # enrollment and the most recent grade of each pair.
+    op.execute(
+        "DELETE FROM enrollments WHERE id NOT IN ("
+        "SELECT MIN(id) FROM enrollments GROUP BY student_id, course_id)"
+    )
+    op.execute(
+        "DELETE FROM grades WHERE id NOT IN ("
+        "SELECT MAX(id) FROM grades GROUP BY student_id, assignment_id)"
+    )
+
+    op.create_index('ix_courses_instructor_id', 'courses', ['instructor_id'], unique=False)
+    op.create_index('uq_enrollments_student_id_course_id', 'enrollments', ['student_id', 'course_id'], unique=True)
+    op.create_index('ix_enrollments_course_id', 'enrollments', ['course_id'], unique=False)
+    op.create_index('ix_assignments_course_id_id', 'assignments', ['course_id', 'id'], unique=False)
+    op.create_index('uq_grades_student_id_assignment_id', 'grades', ['student_id', 'assignment_id'], unique=True)
+    op.create_index('ix_grades_assignment_id_id', 'grades', ['assignment_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_grades_assignment_id_id', table_name='grades')
+    op.drop_index('uq_grades_student_id_assignment_id', table_name='grades')
+    op.drop_index('ix_assignments_course_id_id', table_name='assignments')
+    op.drop_index('ix_enrollments_course_id', table_name='enrollments')
+    op.drop_index('uq_enrollments_student_id_course_id', table_name='enrollments')
+    op.drop_index('ix_courses_instructor_id', table_name='courses')
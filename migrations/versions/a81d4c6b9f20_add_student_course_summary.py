@@ -0,0 +1,57 @@
+"""add student course summary
+
+Revision ID: a81d4c6b9f20
+Revises: 3f9c2a7d1e54
+Create Date: 2026-10-18 11:40:03.518224
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a81d4c6b9f20'
+down_revision = '3f9c2a7d1e54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('student_course_summary',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('enrolled_date', sa.Date(), nullable=True),
+    sa.Column('grade_count', sa.Integer(), nullable=False),
+    sa.Column('grade_sum', sa.Float(), nullable=False),
+    sa.Column('latest_grade', sa.Float(), nullable=True),
+    sa.Column('latest_graded_date', sa.Date(), nullable=True),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('student_id', 'course_id')
+    )
+
+    # Backfill from existing enrollments and grades (same rollup as
+    # api.summary.rebuild_summaries).
+    op.execute("""
+        INSERT INTO student_course_summary
+            (student_id, course_id, enrolled_date, grade_count, grade_sum,
+             latest_grade, latest_graded_date)
+        SELECT e.student_id, e.course_id, e.enrolled_date,
+               COALESCE(g.grade_count, 0), COALESCE(g.grade_sum, 0),
+               latest.grade, latest.graded_date
+        FROM enrollments e
+        LEFT OUTER JOIN (
+            SELECT grades.student_id, assignments.course_id,
+                   COUNT(grades.id) AS grade_count,
+                   SUM(grades.grade) AS grade_sum,
+                   MAX(grades.id) AS latest_id
+            FROM grades
+            JOIN assignments ON assignments.id = grades.assignment_id
+            GROUP BY grades.student_id, assignments.course_id
+        ) g ON g.student_id = e.student_id AND g.course_id = e.course_id
+        LEFT OUTER JOIN grades latest ON latest.id = g.latest_id
+    """)
+
+
+def downgrade():
+    op.drop_table('student_course_summary')
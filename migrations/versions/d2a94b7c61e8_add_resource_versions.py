@@ -0,0 +1,34 @@
+"""add resource versions
+
+Revision ID: d2a94b7c61e8
+Revises: c5e7f18a2b93
+Create Date: 2026-10-18 15:22:47.104936
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a94b7c61e8'
+down_revision = 'c5e7f18a2b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    resource_versions = op.create_table('resource_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # One counter per table tracked by api.versions.
+    op.bulk_insert(resource_versions, [
+        {"name": name, "version": 0}
+        for name in ('courses', 'enrollments', 'assignments', 'grades')
+    ])
+
+
+def downgrade():
+    op.drop_table('resource_versions')
@@ -0,0 +1,43 @@
+"""add summary latest grade id
+
+Revision ID: e6b3f09d4c71
+Revises: d2a94b7c61e8
+Create Date: 2026-10-18 16:48:09.227635
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b3f09d4c71'
+down_revision = 'd2a94b7c61e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('student_course_summary', sa.Column('latest_grade_id', sa.Integer(), nullable=True))
+
+    # Backfill, and repair latest_* that concurrent writers may have left
+    # pointing at an older grade (same ordering as api.summary).
+    op.execute("""
+        UPDATE student_course_summary SET latest_grade_id = (
+            SELECT grades.id
+            FROM grades
+            JOIN assignments ON assignments.id = grades.assignment_id
+            WHERE grades.student_id = student_course_summary.student_id
+              AND assignments.course_id = student_course_summary.course_id
+            ORDER BY grades.graded_date DESC, grades.id DESC
+            LIMIT 1
+        )
+    """)
+    op.execute("""
+        UPDATE student_course_summary SET
+            latest_grade = (SELECT grade FROM grades WHERE grades.id = student_course_summary.latest_grade_id),
+            latest_graded_date = (SELECT graded_date FROM grades WHERE grades.id = student_course_summary.latest_grade_id)
+    """)
+
+
+def downgrade():
+    op.drop_column('student_course_summary', 'latest_grade_id')
@@ -0,0 +1,24 @@
+"""index revoked tokens revoked_at
+
+Revision ID: f1c4a8e27b05
+Revises: e6b3f09d4c71
+Create Date: 2026-10-18 19:41:30.582716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c4a8e27b05'
+down_revision = 'e6b3f09d4c71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_revoked_tokens_revoked_at', 'revoked_tokens', ['revoked_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_revoked_tokens_revoked_at', table_name='revoked_tokens')
@@ -1,96 +1,222 @@
-from api import create_app, db
-from api.models import User, Course, Enrollment, Assignment, Grade
-from faker import Faker
+"""
+Generate a synthetic dataset, from a handful of rows up to production scale.
+
+    python seed.py                                   # small dev dataset
+    python seed.py --students 200000 --courses 5000 --grades-per-student 20 --workers 8
+
+The dataset is a pure function of the arguments and --seed: every id, name,
+enrollment and grade is derived from the row's index, so the same command
+always produces the same rows no matter how many worker processes share the
+work. Rows are written with batched multi-row INSERTs, and every user gets the
+same password hash, computed once.
+"""
+import argparse
+import multiprocessing
 import random
-from datetime import datetime, timedelta, timezone
-
-fake = Faker()
-
-
-def seed_data():
-    app = create_app()
-    with app.app_context():
-        db.session.query(Grade).delete()
-        db.session.query(Assignment).delete()
-        db.session.query(Enrollment).delete()
-        db.session.query(Course).delete()
-        db.session.query(User).delete()
-
-        instructors = []
-        for _ in range(5):
-            instructor = User(
-                name=fake.name()[:50],
-                email=fake.unique.email(),
-                phone=fake.phone_number()[:20],
-                role="instructor",
-            )
-            instructor.set_password("password123")
-            instructors.append(instructor)
-            db.session.add(instructor)
-
-        students = []
-        for _ in range(20):
-            student = User(
-                name=fake.name()[:50],
-                email=fake.unique.email(),
-                phone=fake.phone_number()[:20],
-                role="student",
-            )
-            student.set_password("password123")
-            students.append(student)
-            db.session.add(student)
-
-        db.session.commit()
-
-        courses = []
-        for i in range(10):
-            course = Course(
-                name=f"Course {i + 1}",
-                description=fake.text(max_nb_chars=200)[:200],
-                instructor_id=random.choice(instructors).id,
-            )
-            courses.append(course)
-            db.session.add(course)
+import time
+from datetime import date, timedelta
 
-        db.session.commit()
-
-        for student in students:
-            enrolled_courses = random.sample(courses, k=random.randint(1, 5))
-            for course in enrolled_courses:
-                enrollment = Enrollment(
-                    student_id=student.id, course_id=course.id
-                )
-                db.session.add(enrollment)
+from faker import Faker
+from sqlalchemy import insert, text
+from werkzeug.security import generate_password_hash
 
+from api import create_app, db
+from api.models import User, Course, Enrollment, Assignment, Grade, StudentCourseSummary
+from api.summary import rebuild_summaries
+
+TODAY = date(2025, 1, 1)
+
+
+def _rng(seed, *parts):
+    # Independent, reproducible stream per (seed, table, row index).
+    value = seed
+    for part in parts:
+        value = value * 1_000_003 + part
+    return random.Random(value)
+
+
+def _name_pool(seed):
+    fake = Faker()
+    fake.seed_instance(seed)
+    return [fake.first_name() for _ in range(500)], [fake.last_name() for _ in range(500)]
+
+
+def _name(rng, pool):
+    first_names, last_names = pool
+    return f"{rng.choice(first_names)} {rng.choice(last_names)}"[:100]
+
+
+def _assignment_ids(options, course_index):
+    first = course_index * options.assignments_per_course + 1
+    return range(first, first + options.assignments_per_course)
+
+
+def _reset():
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text(
+            "TRUNCATE student_course_summary, grades, assignments, enrollments, courses, users "
+            "RESTART IDENTITY CASCADE"
+        ))
+    else:
+        for model in (StudentCourseSummary, Grade, Assignment, Enrollment, Course, User):
+            db.session.query(model).delete()
+    db.session.commit()
+
+
+def _insert(model, rows):
+    if rows:
+        db.session.execute(insert(model.__table__), rows)
+
+
+def _load_catalog(options, password_hash, pool):
+    rng = _rng(options.seed, 0)
+    _insert(User, [{
+        "id": index + 1,
+        "name": _name(rng, pool),
+        "email": f"instructor{index + 1}@example.edu",
+        "phone": f"555{index:07d}",
+        "password": password_hash,
+        "role": "instructor",
+    } for index in range(options.instructors)])
+    _insert(Course, [{
+        "id": index + 1,
+        "name": f"Course {index + 1}",
+        "description": f"Synthetic course {index + 1}",
+        "instructor_id": rng.randrange(options.instructors) + 1,
+    } for index in range(options.courses)])
+    _insert(Assignment, [{
+        "id": assignment_id,
+        "title": f"Assignment {assignment_id}",
+        "description": f"Synthetic assignment {assignment_id} for course {index + 1}",
+        "due_date": TODAY + timedelta(days=rng.randint(1, 120)),
+        "course_id": index + 1,
+    } for index in range(options.courses) for assignment_id in _assignment_ids(options, index)])
+    db.session.commit()
+
+
+def _load_students(options, password_hash, pool, start, stop):
+    courses_per_student = min(options.courses_per_student, options.courses)
+    for batch_start in range(start, stop, options.batch_size):
+        users, enrollments, grades = [], [], []
+        for index in range(batch_start, min(batch_start + options.batch_size, stop)):
+            rng = _rng(options.seed, 1, index)
+            student_id = options.instructors + index + 1
+            users.append({
+                "id": student_id,
+                "name": _name(rng, pool),
+                "email": f"student{index + 1}@example.edu",
+                "phone": f"556{index:07d}",
+                "password": password_hash,
+                "role": "student",
+            })
+
+            course_indexes = rng.sample(range(options.courses), courses_per_student)
+            for offset, course_index in enumerate(course_indexes):
+                enrollments.append({
+                    "id": index * courses_per_student + offset + 1,
+                    "student_id": student_id,
+                    "course_id": course_index + 1,
+                    "enrolled_date": TODAY - timedelta(days=rng.randint(0, 365)),
+                })
+
+            available = [assignment_id for course_index in course_indexes
+                         for assignment_id in _assignment_ids(options, course_index)]
+            graded = rng.sample(available, min(options.grades_per_student, len(available)))
+            for offset, assignment_id in enumerate(graded):
+                grades.append({
+                    "id": index * options.grades_per_student + offset + 1,
+                    "assignment_id": assignment_id,
+                    "student_id": student_id,
+                    "grade": round(rng.uniform(50.0, 100.0), 2),
+                    "graded_date": TODAY + timedelta(days=rng.randint(0, 120)),
+                })
+
+        _insert(User, users)
+        _insert(Enrollment, enrollments)
+        _insert(Grade, grades)
         db.session.commit()
 
-        assignments = []
-        for course in courses:
-            for _ in range(random.randint(2, 5)):
-                assignment = Assignment(
-                    title=fake.sentence(nb_words=5)[:100],
-                    description=fake.text(max_nb_chars=150)[:150],
-                    due_date=datetime.now(timezone.utc) + timedelta(days=random.randint(1, 30)),
-                    course_id=course.id,
-                )
-                assignments.append(assignment)
-                db.session.add(assignment)
 
-        db.session.commit()
-
-        for assignment in assignments:
-            enrolled_students = Enrollment.query.filter_by(course_id=assignment.course_id).all()
-            for enrollment in enrolled_students:
-                grade = Grade(
-                    assignment_id=assignment.id,
-                    student_id=enrollment.student_id,
-                    grade=random.uniform(50.0, 100.0),
-                )
-                db.session.add(grade)
+def _worker(database_uri, options, password_hash, start, stop):
+    # Runs in a freshly spawned process with its own engine and pool, against
+    # the parent's database rather than whatever DATABASE_URL says.
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_uri})
+    with app.app_context():
+        _load_students(options, password_hash, _name_pool(options.seed), start, stop)
+        db.engine.dispose()
+
+
+def _reset_sequences():
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for table in ('users', 'courses', 'assignments', 'enrollments', 'grades'):
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+        ))
+    db.session.commit()
+
+
+def seed_data(options=None, app=None):
+    """
+    Fill the database described by `app` (or a new create_app()) according to
+    `options`, the namespace produced by parse_args().
+    """
+    options = options or parse_args([])
+    app = app or create_app()
+    started = time.perf_counter()
+    password_hash = generate_password_hash(options.password, app.config['PASSWORD_HASH_METHOD'])
+    pool = _name_pool(options.seed)
 
+    with app.app_context():
+        _reset()
+        _load_catalog(options, password_hash, pool)
+
+        if options.workers > 1 and options.students:
+            db.engine.dispose()
+            step = -(-options.students // options.workers)
+            ranges = [(start, min(start + step, options.students))
+                      for start in range(0, options.students, step)]
+            context = multiprocessing.get_context('spawn')
+            with context.Pool(options.workers) as workers:
+                database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+                workers.starmap(_worker, [(database_uri, options, password_hash, start, stop)
+                                          for start, stop in ranges])
+        else:
+            _load_students(options, password_hash, pool, 0, options.students)
+
+        rebuild_summaries()
         db.session.commit()
-        print("Seeding complete!")
+        _reset_sequences()
+
+        counts = {model.__tablename__: db.session.query(model).count()
+                  for model in (User, Course, Assignment, Enrollment, Grade)}
+
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(f"Seeding complete in {elapsed:.1f}s ({total / elapsed:.0f} rows/s): "
+          + ", ".join(f"{count} {table}" for table, count in counts.items()))
+    return counts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset.")
+    parser.add_argument('--instructors', type=int, default=5)
+    parser.add_argument('--students', type=int, default=20)
+    parser.add_argument('--courses', type=int, default=10)
+    parser.add_argument('--assignments-per-course', type=int, default=3)
+    parser.add_argument('--courses-per-student', type=int, default=3)
+    parser.add_argument('--grades-per-student', type=int, default=6)
+    parser.add_argument('--password', default='password123',
+                        help="password shared by every generated user")
+    parser.add_argument('--seed', type=int, default=42,
+                        help="the same seed always produces the same dataset")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes used to generate and insert students")
+    parser.add_argument('--batch-size', type=int, default=5000,
+                        help="students written per INSERT batch and transaction")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    seed_data()
\ No newline at end of file
+    seed_data(parse_args())